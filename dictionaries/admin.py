@@ -11,6 +11,11 @@ class DictionaryElementInline(admin.TabularInline):
     model = DictionaryElement
     extra = 1
 
+    def has_add_permission(self, request, obj=None):
+        if obj is not None and obj.archived:
+            return False
+        return super().has_add_permission(request, obj)
+
 
 @admin.register(Dictionary)
 class DictionaryAdmin(admin.ModelAdmin):
@@ -26,9 +31,19 @@ class DictionaryVersionAdmin(admin.ModelAdmin):
     list_filter = ('dictionary', 'start_date')
     inlines = [DictionaryElementInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('element_filter')
+
 
 @admin.register(DictionaryElement)
 class DictionaryElementAdmin(admin.ModelAdmin):
     list_display = ('version', 'code', 'value')
     search_fields = ('code', 'value')
     list_filter = ('version__dictionary', 'version')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'version':
+            kwargs['queryset'] = DictionaryVersion.objects.filter(
+                archived=False
+            ).defer('element_filter')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
@@ -0,0 +1,239 @@
+import json
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import (
+    ArchivedElementCode, ArchivedElements, DictionaryElement,
+    DictionaryVersion,
+)
+from .normalization import normalize_text
+
+
+def encode_elements(pairs):
+    """
+    Упаковывает пары `(code, value)` в сжатый JSON.
+    """
+    return zlib.compress(
+        json.dumps(list(pairs), ensure_ascii=False).encode(), 9
+    )
+
+
+def decode_elements(payload):
+    """
+    Распаковывает пары `(code, value)` из сжатого JSON.
+    """
+    return [tuple(pair) for pair in json.loads(zlib.decompress(payload))]
+
+
+def load_archived_pairs(version_id, using=None):
+    """
+    Читает из базы и распаковывает архив элементов версии.
+
+    Возвращает пустой список, если архива нет.
+    """
+    payloads = ArchivedElements.objects.filter(version_id=version_id)
+    if using:
+        payloads = payloads.using(using)
+    payload = payloads.values_list('payload', flat=True).first()
+    return decode_elements(bytes(payload)) if payload else []
+
+
+class ArchiveCache:
+    """
+    Кэш распакованных архивов, ограниченный объёмом памяти.
+
+    Архив одной версии может содержать миллионы элементов, поэтому размер
+    кэша ограничивается не числом архивов, а оценкой занимаемой ими памяти
+    (`ARCHIVE_CACHE_MAX_BYTES`). При превышении лимита вытесняются давно
+    не использованные архивы. Архив больше лимита не кэшируется вовсе.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """
+        Возвращает значение по ключу, вызывая `load()` при промахе.
+
+        `load()` возвращает пару `(значение, оценка размера в байтах)`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        value, size = load()
+        max_size = settings.ARCHIVE_CACHE_MAX_BYTES
+        if size > max_size:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._size += size
+            while self._size > max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_cache = ArchiveCache()
+
+
+def _strings_size(pairs):
+    return sum(
+        sys.getsizeof(code) + sys.getsizeof(value) for code, value in pairs
+    )
+
+
+def _load_elements(version_id):
+    elements = dict(load_archived_pairs(version_id))
+    return elements, sys.getsizeof(elements) + _strings_size(elements.items())
+
+
+def _load_normalized_index(version_id, revision):
+    index = frozenset(
+        (normalize_text(code), normalize_text(value))
+        for code, value in _archived_elements(version_id, revision).items()
+    )
+    return index, (
+        sys.getsizeof(index)
+        + len(index) * sys.getsizeof((None, None))
+        + _strings_size(index)
+    )
+
+
+def _archived_elements(version_id, revision):
+    # Коды в версии уникальны, поэтому архив хранится как словарь
+    # `code -> value`, который сохраняет порядок элементов архива.
+    return _cache.get(
+        ('elements', version_id, revision),
+        lambda: _load_elements(version_id),
+    )
+
+
+def archived_elements(version):
+    """
+    Возвращает пары `(code, value)` архивной версии.
+
+    Распакованные архивы кэшируются в памяти процесса (см.
+    `ArchiveCache`). Ключ кэша включает `elements_revision`, поэтому
+    пересозданная версия с тем же идентификатором не получит чужие данные.
+    """
+    return _archived_elements(version.pk, version.elements_revision).items()
+
+
+def archived_contains(version, code, value, normalized=False):
+    """
+    Проверяет наличие элемента в архиве версии.
+    """
+    if normalized:
+        index = _cache.get(
+            ('normalized', version.pk, version.elements_revision),
+            lambda: _load_normalized_index(
+                version.pk, version.elements_revision
+            ),
+        )
+        return (normalize_text(code), normalize_text(value)) in index
+
+    elements = _archived_elements(version.pk, version.elements_revision)
+    return code in elements and elements[code] == value
+
+
+def cold_versions(cutoff):
+    """
+    Возвращает неархивированные версии, которые перестали быть текущими
+    раньше даты `cutoff`: у справочника есть более новая версия с датой
+    начала не позже `cutoff`.
+    """
+    superseded = DictionaryVersion.objects.filter(
+        dictionary_id=OuterRef('dictionary_id'),
+        start_date__gt=OuterRef('start_date'),
+        start_date__lte=cutoff,
+    )
+    return DictionaryVersion.objects.filter(
+        Exists(superseded), archived=False,
+    ).defer('element_filter')
+
+
+def archive_version(version, using=DEFAULT_DB_ALIAS):
+    """
+    Переносит элементы версии в сжатый архив.
+
+    Коды элементов записываются в `ArchivedElementCode` для обратного
+    поиска. Строки элементов удаляются одним SQL-запросом без сигналов
+    моделей: содержимое версии не меняется, поэтому в журнал изменений
+    ничего не пишется, а действительный фильтр Блума остаётся
+    действительным и для новой ревизии элементов. Ревизия увеличивается,
+    чтобы кэши, построенные по прежнему месту хранения, не использовались.
+
+    После архивации запись элементов версии запрещена триггерами базы
+    данных, поэтому архив остаётся единственным источником её элементов.
+    Для уже архивированной версии вызывается `ValueError`. Возвращает
+    количество элементов.
+    """
+    with transaction.atomic(using=using):
+        versions = DictionaryVersion.objects.using(using).filter(pk=version.pk)
+        revision, filter_revision, archived = (
+            versions.select_for_update().values_list(
+                'elements_revision', 'element_filter_revision', 'archived',
+            ).get()
+        )
+        if archived:
+            raise ValueError(f'Версия {version.pk} уже архивирована.')
+
+        pairs = list(DictionaryElement.objects.using(using).filter(
+            version_id=version.pk
+        ).order_by('pk').values_list('code', 'value'))
+        ArchivedElements.objects.using(using).create(
+            version_id=version.pk,
+            payload=encode_elements(pairs),
+            element_count=len(pairs),
+        )
+        ArchivedElementCode.objects.using(using).bulk_create(
+            (ArchivedElementCode(version_id=version.pk, code=code)
+             for code, _ in pairs),
+            batch_size=2000,
+        )
+
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM %s WHERE %s = %%s' % (
+                    connection.ops.quote_name(
+                        DictionaryElement._meta.db_table
+                    ),
+                    connection.ops.quote_name(
+                        DictionaryElement._meta.get_field('version').column
+                    ),
+                ),
+                [version.pk],
+            )
+
+        # Триггеры уже увеличили ревизию при удалении строк.
+        new_revision = versions.values_list(
+            'elements_revision', flat=True
+        ).get() + 1
+        versions.update(
+            archived=True,
+            elements_revision=new_revision,
+            element_filter_revision=(
+                new_revision if filter_revision == revision
+                else filter_revision
+            ),
+        )
+    return len(pairs)
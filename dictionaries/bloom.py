@@ -0,0 +1,70 @@
+import hashlib
+import math
+import struct
+
+# Заголовок сериализованного фильтра: размер в битах и число хешей.
+_HEADER = struct.Struct('>IB')
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по парам `(code, value)` элементов справочника.
+
+    Отрицательный ответ фильтра точен: если пары нет в фильтре, её нет и в
+    версии справочника. Положительный ответ может быть ложным с
+    вероятностью около `error_rate`, поэтому его нужно подтверждать
+    запросом к базе. При доле ошибок 1% фильтр занимает около 1,2 байта
+    на элемент.
+    """
+
+    def __init__(self, size, hash_count, bits=None):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        size = max(
+            64,
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2),
+        )
+        hash_count = min(8, max(1, round(size / capacity * math.log(2))))
+        return cls(size, hash_count)
+
+    @classmethod
+    def from_bytes(cls, data):
+        size, hash_count = _HEADER.unpack_from(data)
+        return cls(size, hash_count, data[_HEADER.size:])
+
+    def to_bytes(self):
+        return _HEADER.pack(self.size, self.hash_count) + bytes(self.bits)
+
+    def _positions(self, code, value):
+        # Каждая позиция берётся из своих 8 байт одного хеша BLAKE2b,
+        # поэтому число хешей ограничено восемью.
+        key = f'{code}\x1f{value}'.encode()
+        digest = hashlib.blake2b(key, digest_size=8 * self.hash_count)
+        for (number,) in struct.iter_unpack('>Q', digest.digest()):
+            yield number % self.size
+
+    def is_saturated(self):
+        """
+        Проверяет, заполнен ли фильтр сверх расчётной ёмкости.
+
+        У фильтра, заполненного до расчётной ёмкости, установлена примерно
+        половина битов. Дальше доля ложных срабатываний быстро растёт, и
+        фильтр стоит построить заново с большей ёмкостью.
+        """
+        return int.from_bytes(self.bits, 'big').bit_count() * 2 > self.size
+
+    def add(self, code, value):
+        for position in self._positions(code, value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        code, value = item
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(code, value)
+        )
@@ -0,0 +1,199 @@
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from .models import ChangeEvent, DictionaryVersion
+
+LATEST_EVENT_CACHE_KEY = 'refbooks:changefeed:latest'
+
+
+def _create_event(using, **fields):
+    event = ChangeEvent.objects.using(using).create(**fields)
+    # Кэш сбрасывается после фиксации: до неё событие не видно читателям.
+    transaction.on_commit(
+        partial(cache.delete, LATEST_EVENT_CACHE_KEY), using=using,
+        robust=True,
+    )
+    return event
+
+
+def record_version_event(kind, version, using):
+    """
+    Записывает в журнал событие об изменении версии справочника.
+
+    Событие записывается в той же транзакции, что и изменение, поэтому
+    фиксируется или откатывается вместе с ним. Возвращает событие.
+    """
+    return _create_event(
+        using,
+        kind=kind,
+        dictionary_id=version.dictionary_id,
+        version_id=version.pk,
+        version=version.version,
+        start_date=version.start_date,
+    )
+
+
+def record_elements_changed(version_id, using):
+    """
+    Записывает событие `elements_changed` для версии в текущей транзакции.
+    Возвращает событие.
+    """
+    version = DictionaryVersion.objects.using(using).only(
+        'dictionary_id', 'version', 'start_date'
+    ).get(pk=version_id)
+    return record_version_event(ChangeEvent.ELEMENTS_CHANGED, version, using)
+
+
+def latest_event_id():
+    """
+    Возвращает идентификатор последнего события журнала.
+
+    Значение кэшируется на `CHANGE_FEED_POLL_INTERVAL` секунд, поэтому
+    подписчики одного процесса опрашивают базу не чаще одного раза за
+    интервал, а не каждый по отдельности.
+    """
+    latest = cache.get(LATEST_EVENT_CACHE_KEY)
+    if latest is None:
+        latest = ChangeEvent.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+        cache.set(
+            LATEST_EVENT_CACHE_KEY, latest, settings.CHANGE_FEED_POLL_INTERVAL
+        )
+    return latest
+
+
+def fetch_events(after, limit):
+    """
+    Возвращает до `limit` событий с идентификатором больше `after`.
+
+    Идентификатор события выделяется при вставке, а видимым событие
+    становится при фиксации транзакции изменения, поэтому событие с
+    меньшим идентификатором может появиться позже события с большим. Чтобы
+    подписчик, уже продвинувший смещение, не пропустил такое событие,
+    отдаются только события старше `CHANGE_FEED_SETTLE_DELAY` секунд, а
+    чтение останавливается на первом более свежем событии.
+
+    Журнал читается из основной базы: отставание реплики не ограничено
+    задержкой `CHANGE_FEED_SETTLE_DELAY`, и на реплике событие могло бы
+    стать видимым уже после того, как подписчик прошёл его смещение.
+    """
+    if latest_event_id() <= after:
+        return []
+    settled_before = timezone.now() - timedelta(
+        seconds=settings.CHANGE_FEED_SETTLE_DELAY
+    )
+    events = []
+    for event in ChangeEvent.objects.filter(id__gt=after)[:limit]:
+        if event.created_at > settled_before:
+            break
+        events.append(event)
+    return events
+
+
+def release_connections():
+    """
+    Закрывает соединения текущего потока с базами данных.
+
+    Вызывается перед ожиданием событий, чтобы ожидающий подписчик не
+    удерживал соединение (`CONN_MAX_AGE`) на всё время ожидания.
+    Соединения внутри транзакции не закрываются.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+class ChangeNotifier:
+    """
+    Общий для процесса наблюдатель за журналом изменений.
+
+    Пока есть ожидающие подписчики, один фоновый поток раз в
+    `CHANGE_FEED_POLL_INTERVAL` секунд читает идентификатор последнего
+    события и будит подписчиков, ожидающих более новых событий. Сами
+    подписчики во время ожидания к базе не обращаются. Когда ожидающих не
+    остаётся, поток завершается.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._latest = None
+        self._waiters = 0
+        self._thread = None
+
+    def wait(self, after, timeout):
+        """
+        Ждёт события с идентификатором больше `after` не дольше `timeout`
+        секунд. Возвращает `True`, если такое событие записано.
+        """
+        with self._condition:
+            self._waiters += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='changefeed-notifier', daemon=True,
+                )
+                self._thread.start()
+            try:
+                return self._condition.wait_for(
+                    lambda: self._latest is not None and self._latest > after,
+                    timeout,
+                )
+            finally:
+                self._waiters -= 1
+
+    def _run(self):
+        while True:
+            try:
+                latest = latest_event_id()
+            except DatabaseError:
+                latest = None
+            finally:
+                connections.close_all()
+
+            with self._condition:
+                if latest is not None and latest != self._latest:
+                    self._latest = latest
+                    self._condition.notify_all()
+                if not self._waiters:
+                    self._latest = None
+                    self._thread = None
+                    return
+            time.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
+
+
+notifier = ChangeNotifier()
+
+
+def wait_for_events(after, limit, timeout):
+    """
+    Возвращает до `limit` событий после `after`, ожидая их появления не
+    дольше `timeout` секунд.
+
+    На время ожидания соединения с базой закрываются, а о новых событиях
+    сообщает общий `notifier`, поэтому число ожидающих подписчиков не
+    увеличивает нагрузку на базу.
+    """
+    deadline = time.monotonic() + timeout
+    events = fetch_events(after, limit)
+    while not events:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        release_connections()
+        if not notifier.wait(after, remaining):
+            break
+        events = fetch_events(after, limit)
+        if not events:
+            # Событие записано, но ещё не старше CHANGE_FEED_SETTLE_DELAY.
+            time.sleep(max(0, min(
+                settings.CHANGE_FEED_POLL_INTERVAL,
+                deadline - time.monotonic(),
+            )))
+    return events
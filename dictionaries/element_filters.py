@@ -0,0 +1,152 @@
+from itertools import chain
+
+from .archive import load_archived_pairs
+from .bloom import BloomFilter
+from .models import DictionaryElement, DictionaryVersion
+
+# Загруженные фильтры: идентификатор версии -> (ревизия фильтра, фильтр).
+_filters = {}
+
+
+def build_element_filter(pairs, capacity):
+    """
+    Строит фильтр Блума по парам `(code, value)`.
+
+    Ёмкость фильтра берётся вдвое больше числа пар, чтобы в него можно
+    было добавлять новые элементы (см. `add_to_element_filter()`).
+    """
+    element_filter = BloomFilter.for_capacity(capacity * 2)
+    for code, value in pairs:
+        element_filter.add(code, value)
+    return element_filter
+
+
+def rebuild_element_filters(version_ids, using):
+    """
+    Перестраивает фильтры элементов указанных версий.
+
+    В фильтр попадают элементы из таблицы и, для архивных версий, из архива.
+
+    Фильтр сохраняется вместе с ревизией элементов, по которой он
+    построен. Запись выполняется только если ревизия версии не изменилась
+    с момента чтения элементов. Иначе элементы успели измениться и
+    построение повторяется.
+    """
+    for version_id in version_ids:
+        versions = DictionaryVersion.objects.using(using).filter(pk=version_id)
+        while True:
+            state = versions.values_list(
+                'elements_revision', 'archived'
+            ).first()
+            if state is None:
+                break
+            revision, archived = state
+
+            elements = DictionaryElement.objects.using(using).filter(
+                version_id=version_id
+            ).values_list('code', 'value')
+            archived_pairs = (
+                load_archived_pairs(version_id, using) if archived else []
+            )
+            element_filter = build_element_filter(
+                chain(archived_pairs, elements.iterator()),
+                len(archived_pairs) + elements.count(),
+            )
+            if versions.filter(elements_revision=revision).update(
+                element_filter=element_filter.to_bytes(),
+                element_filter_revision=revision,
+            ):
+                break
+
+
+def add_to_element_filter(version_id, pairs, start_revision, end_revision,
+                          using):
+    """
+    Добавляет в фильтр версии пары `(code, value)` вставленных элементов.
+
+    Фильтр дополняется, только если он был актуален до вставки (построен
+    по ревизии `start_revision`), а после неё элементы версии больше не
+    менялись (ревизия равна `end_revision`). Иначе фильтр остаётся
+    устаревшим, пока его не перестроит команда `rebuild_element_filters`;
+    проверка элементов тем временем идёт в базу. Если фильтр ещё не
+    построен (например, у новой версии), он строится целиком.
+
+    Когда фильтр заполняется сверх расчётной ёмкости, он перестраивается
+    целиком с двойным запасом. Ёмкость при этом растёт вдвое, поэтому
+    полное перестроение приходится в среднем на постоянное число вставок.
+    """
+    versions = DictionaryVersion.objects.using(using).filter(pk=version_id)
+    state = versions.values_list(
+        'elements_revision', 'element_filter_revision'
+    ).first()
+    if state is None or state[0] != end_revision:
+        return
+    filter_revision = state[1]
+    if filter_revision is None:
+        rebuild_element_filters([version_id], using)
+        return
+    if filter_revision != start_revision:
+        return
+    element_filter = _load_filter(version_id, start_revision, using)
+    if element_filter is None:
+        return
+    # Загруженный фильтр общий для запросов процесса и не изменяется.
+    element_filter = BloomFilter.from_bytes(element_filter.to_bytes())
+
+    for code, value in pairs:
+        element_filter.add(code, value)
+    if element_filter.is_saturated():
+        rebuild_element_filters([version_id], using)
+        return
+
+    if versions.filter(
+        elements_revision=end_revision,
+        element_filter_revision=filter_revision,
+    ).update(
+        element_filter=element_filter.to_bytes(),
+        element_filter_revision=end_revision,
+    ):
+        _filters[version_id] = (end_revision, element_filter)
+
+
+def _load_filter(version_id, revision, using=None):
+    cached = _filters.get(version_id)
+    if cached is not None and cached[0] == revision:
+        return cached[1]
+
+    data = DictionaryVersion.objects.using(using).filter(
+        pk=version_id, element_filter_revision=revision,
+    ).values_list('element_filter', flat=True).first()
+    element_filter = BloomFilter.from_bytes(bytes(data)) if data else None
+    if element_filter is not None:
+        _filters[version_id] = (revision, element_filter)
+    return element_filter
+
+
+def get_element_filter(version):
+    """
+    Возвращает фильтр версии, загружая его из базы при смене ревизии.
+
+    Возвращает `None`, если фильтр не построен или устарел, то есть
+    построен по другой ревизии элементов, чем текущая. Фильтры всех версий
+    хранятся в памяти процесса. Для проверки актуальности достаточно полей
+    ревизий, которые читаются вместе с версией, поэтому отдельный запрос
+    нужен только при первой загрузке или после перестроения фильтра.
+    """
+    revision = version.element_filter_revision
+    if revision is None or revision != version.elements_revision:
+        return None
+    return _load_filter(version.pk, revision)
+
+
+def might_contain(version, code, value):
+    """
+    Проверяет, может ли элемент `(code, value)` присутствовать в версии.
+
+    `False` означает, что элемента точно нет и запрос к базе не нужен.
+    Если фильтр не построен или устарел, возвращается `True`.
+    """
+    if code is None or value is None:
+        return False
+    element_filter = get_element_filter(version)
+    return element_filter is None or (code, value) in element_filter
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dictionaries.archive import archive_version, cold_versions
+
+
+class Command(BaseCommand):
+    """
+    Архивация элементов старых версий справочников.
+
+    Команда переносит элементы версий, переставших быть текущими более
+    `--days` дней назад (по умолчанию `settings.ARCHIVE_AFTER_DAYS`), в
+    сжатые архивы `ArchivedElements`. Текущие и будущие версии не
+    архивируются.
+    """
+    help = 'Переносит элементы старых версий справочников в сжатый архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Сколько дней версия должна быть нетекущей '
+                 '(по умолчанию settings.ARCHIVE_AFTER_DAYS).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать версии, которые будут архивированы.',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = settings.ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now().date() - timezone.timedelta(days=days)
+
+        versions = cold_versions(cutoff).select_related('dictionary')
+        for version in versions:
+            if options['dry_run']:
+                self.stdout.write(f'{version}')
+                continue
+            count = archive_version(version)
+            self.stdout.write(f'{version}: архивировано элементов {count}')
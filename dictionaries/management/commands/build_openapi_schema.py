@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+SCHEMA_FILES = {
+    'openapi.json': OpenAPICodecJson,
+    'openapi.yaml': OpenAPICodecYaml,
+}
+
+
+class Command(BaseCommand):
+    """
+    Генерация статической OpenAPI-схемы.
+
+    Команда один раз строит схему API и сохраняет её в `openapi.json` и
+    `openapi.yaml` в каталоге `settings.OPENAPI_SCHEMA_DIR` (или в каталоге
+    из `--output-dir`). Запускается на этапе сборки, после чего `/swagger/`,
+    `/redoc/` и `/openapi.json` отдают готовый файл без интроспекции
+    представлений на каждый запрос.
+    """
+    help = 'Генерирует статическую OpenAPI-схему (JSON и YAML).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=None,
+            help='Каталог для файлов схемы '
+                 '(по умолчанию settings.OPENAPI_SCHEMA_DIR).',
+        )
+
+    def handle(self, *args, **options):
+        output_dir = Path(options['output_dir'] or settings.OPENAPI_SCHEMA_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        generator = OpenAPISchemaGenerator(info=swagger_settings.DEFAULT_INFO)
+        schema = generator.get_schema(request=None, public=True)
+
+        for filename, codec_class in SCHEMA_FILES.items():
+            path = output_dir / filename
+            path.write_bytes(codec_class(validators=[]).encode(schema))
+            self.stdout.write(f'Схема записана в {path}')
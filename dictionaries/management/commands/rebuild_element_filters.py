@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Q
+
+from dictionaries.element_filters import rebuild_element_filters
+from dictionaries.models import DictionaryVersion
+
+
+class Command(BaseCommand):
+    """
+    Перестроение фильтров Блума элементов справочников.
+
+    Вставленные элементы (в том числе через `bulk_create()`) добавляются в
+    фильтр автоматически. После изменения и удаления элементов, прямых
+    SQL-запросов и параллельных записей в одну версию фильтр версии
+    считается устаревшим, и проверка элементов выполняется запросом к
+    базе, пока команда не перестроит фильтр. Команду с `--stale` стоит
+    запускать периодически, например из cron.
+    """
+    help = 'Перестраивает фильтры Блума элементов версий справочников.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'version_ids', nargs='*', type=int,
+            help='Идентификаторы версий (по умолчанию все версии).',
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Перестроить только устаревшие и непостроенные фильтры.',
+        )
+
+    def handle(self, *args, **options):
+        versions = DictionaryVersion.objects.all()
+        if options['version_ids']:
+            versions = versions.filter(pk__in=options['version_ids'])
+        if options['stale']:
+            versions = versions.filter(
+                Q(element_filter_revision__isnull=True)
+                | ~Q(element_filter_revision=F('elements_revision'))
+            )
+        version_ids = list(versions.values_list('pk', flat=True))
+        rebuild_element_filters(version_ids, DEFAULT_DB_ALIAS)
+        self.stdout.write(f'Перестроено фильтров: {len(version_ids)}')
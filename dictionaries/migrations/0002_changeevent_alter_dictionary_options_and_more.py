@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('version_created', 'Версия создана'), ('version_updated', 'Версия изменена'), ('version_deleted', 'Версия удалена'), ('elements_changed', 'Элементы изменены')], max_length=30)),
+                ('dictionary_id', models.BigIntegerField()),
+                ('version_id', models.BigIntegerField()),
+                ('version', models.CharField(max_length=50)),
+                ('start_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Событие изменения',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='dictionary',
+            options={'verbose_name': 'Справочник', 'verbose_name_plural': 'Справочники'},
+        ),
+        migrations.AlterModelOptions(
+            name='dictionaryelement',
+            options={'verbose_name': 'Элемент справочника', 'verbose_name_plural': 'Элементы справочников'},
+        ),
+        migrations.AlterModelOptions(
+            name='dictionaryversion',
+            options={'verbose_name': 'Версия справочника', 'verbose_name_plural': 'Версии справочников'},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+from dictionaries.bloom import BloomFilter
+
+
+def build_element_filters(apps, schema_editor):
+    DictionaryVersion = apps.get_model('dictionaries', 'DictionaryVersion')
+    DictionaryElement = apps.get_model('dictionaries', 'DictionaryElement')
+    db_alias = schema_editor.connection.alias
+
+    for version in DictionaryVersion.objects.using(db_alias).only('pk'):
+        elements = DictionaryElement.objects.using(db_alias).filter(
+            version_id=version.pk
+        ).values_list('code', 'value')
+        element_filter = BloomFilter.for_capacity(elements.count())
+        for code, value in elements.iterator():
+            element_filter.add(code, value)
+        DictionaryVersion.objects.using(db_alias).filter(pk=version.pk).update(
+            element_filter=element_filter.to_bytes(), elements_revision=1,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0002_changeevent_alter_dictionary_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dictionaryversion',
+            name='element_filter',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dictionaryversion',
+            name='elements_revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            build_element_filters, migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+from dictionaries.normalization import normalize_text
+
+
+def normalize_elements(apps, schema_editor):
+    DictionaryElement = apps.get_model('dictionaries', 'DictionaryElement')
+    elements = DictionaryElement.objects.using(
+        schema_editor.connection.alias
+    ).only('code', 'value').order_by('pk')
+
+    last_pk = 0
+    while batch := list(elements.filter(pk__gt=last_pk)[:2000]):
+        for element in batch:
+            element.code_normalized = normalize_text(element.code)[:200]
+            element.value_normalized = normalize_text(element.value)[:600]
+        elements.bulk_update(batch, ['code_normalized', 'value_normalized'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0003_element_filter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dictionaryelement',
+            name='code_normalized',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='dictionaryelement',
+            name='value_normalized',
+            field=models.CharField(default='', editable=False, max_length=600),
+        ),
+        migrations.RunPython(
+            normalize_elements, migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='dictionaryelement',
+            index=models.Index(fields=['version', 'code_normalized', 'value_normalized'], name='element_normalized_idx'),
+        ),
+    ]
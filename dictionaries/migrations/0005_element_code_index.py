@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-19 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0004_element_normalized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dictionaryelement',
+            index=models.Index(fields=['code', 'version'], name='element_code_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-19 11:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0005_element_code_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedElements',
+            fields=[
+                ('version', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='dictionaries.dictionaryversion')),
+                ('payload', models.BinaryField()),
+                ('element_count', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Архив элементов',
+                'verbose_name_plural': 'Архивы элементов',
+            },
+        ),
+        migrations.AddField(
+            model_name='dictionaryversion',
+            name='archived',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
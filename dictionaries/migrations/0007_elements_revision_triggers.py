@@ -0,0 +1,156 @@
+# Generated by Django 5.1 on 2026-10-19 14:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+TRIGGER_NAMES = (
+    'dictionaries_element_revision_insert',
+    'dictionaries_element_revision_update',
+    'dictionaries_element_revision_delete',
+)
+
+SQLITE_TRIGGERS = (
+    'CREATE TRIGGER dictionaries_element_revision_insert '
+    'AFTER INSERT ON {element} BEGIN '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id = NEW.version_id; END',
+
+    'CREATE TRIGGER dictionaries_element_revision_update '
+    'AFTER UPDATE ON {element} BEGIN '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id IN (OLD.version_id, NEW.version_id); END',
+
+    'CREATE TRIGGER dictionaries_element_revision_delete '
+    'AFTER DELETE ON {element} BEGIN '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id = OLD.version_id; END',
+)
+
+MYSQL_TRIGGERS = (
+    'CREATE TRIGGER dictionaries_element_revision_insert '
+    'AFTER INSERT ON {element} FOR EACH ROW '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id = NEW.version_id',
+
+    'CREATE TRIGGER dictionaries_element_revision_update '
+    'AFTER UPDATE ON {element} FOR EACH ROW '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id IN (OLD.version_id, NEW.version_id)',
+
+    'CREATE TRIGGER dictionaries_element_revision_delete '
+    'AFTER DELETE ON {element} FOR EACH ROW '
+    'UPDATE {version} SET elements_revision = elements_revision + 1 '
+    'WHERE id = OLD.version_id',
+)
+
+# В PostgreSQL триггеры срабатывают один раз на запрос и увеличивают
+# ревизию каждой затронутой версии на единицу, а не на каждую строку.
+POSTGRESQL_TRIGGERS = (
+    '''
+    CREATE OR REPLACE FUNCTION dictionaries_bump_elements_revision()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE {version} SET elements_revision = elements_revision + 1
+            WHERE id IN (SELECT version_id FROM new_rows);
+        ELSIF TG_OP = 'UPDATE' THEN
+            UPDATE {version} SET elements_revision = elements_revision + 1
+            WHERE id IN (
+                SELECT version_id FROM new_rows
+                UNION SELECT version_id FROM old_rows
+            );
+        ELSE
+            UPDATE {version} SET elements_revision = elements_revision + 1
+            WHERE id IN (SELECT version_id FROM old_rows);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+
+    'CREATE TRIGGER dictionaries_element_revision_insert '
+    'AFTER INSERT ON {element} REFERENCING NEW TABLE AS new_rows '
+    'FOR EACH STATEMENT EXECUTE FUNCTION dictionaries_bump_elements_revision()',
+
+    'CREATE TRIGGER dictionaries_element_revision_update '
+    'AFTER UPDATE ON {element} '
+    'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+    'FOR EACH STATEMENT EXECUTE FUNCTION dictionaries_bump_elements_revision()',
+
+    'CREATE TRIGGER dictionaries_element_revision_delete '
+    'AFTER DELETE ON {element} REFERENCING OLD TABLE AS old_rows '
+    'FOR EACH STATEMENT EXECUTE FUNCTION dictionaries_bump_elements_revision()',
+)
+
+TRIGGERS = {
+    'sqlite': SQLITE_TRIGGERS,
+    'mysql': MYSQL_TRIGGERS,
+    'postgresql': POSTGRESQL_TRIGGERS,
+}
+
+
+def _tables(apps, schema_editor):
+    quote_name = schema_editor.connection.ops.quote_name
+    return {
+        'element': quote_name(
+            apps.get_model('dictionaries', 'DictionaryElement')._meta.db_table
+        ),
+        'version': quote_name(
+            apps.get_model('dictionaries', 'DictionaryVersion')._meta.db_table
+        ),
+    }
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in TRIGGERS:
+        raise NotImplementedError(
+            f'Триггеры ревизии элементов не поддерживаются для {vendor}.'
+        )
+    tables = _tables(apps, schema_editor)
+    for statement in TRIGGERS[vendor]:
+        schema_editor.execute(statement.format(**tables))
+
+
+def drop_triggers(apps, schema_editor):
+    tables = _tables(apps, schema_editor)
+    on_table = (
+        ' ON {element}' if schema_editor.connection.vendor == 'postgresql'
+        else ''
+    )
+    for name in TRIGGER_NAMES:
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS {name}{on_table}'.format(**tables)
+        )
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP FUNCTION IF EXISTS dictionaries_bump_elements_revision()'
+        )
+
+
+def mark_filters_current(apps, schema_editor):
+    # До этой миграции ревизия увеличивалась только при перестроении
+    # фильтра, поэтому сохранённые фильтры соответствуют текущей ревизии.
+    DictionaryVersion = apps.get_model('dictionaries', 'DictionaryVersion')
+    DictionaryVersion.objects.using(schema_editor.connection.alias).filter(
+        element_filter__isnull=False,
+    ).update(element_filter_revision=F('elements_revision'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0006_archived_elements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dictionaryversion',
+            name='element_filter_revision',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            mark_filters_current, migrations.RunPython.noop,
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1 on 2026-10-19 14:05
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_archived_codes(apps, schema_editor):
+    ArchivedElements = apps.get_model('dictionaries', 'ArchivedElements')
+    ArchivedElementCode = apps.get_model('dictionaries', 'ArchivedElementCode')
+    db_alias = schema_editor.connection.alias
+
+    archives = ArchivedElements.objects.using(db_alias).values_list(
+        'version_id', 'payload'
+    )
+    for version_id, payload in archives.iterator():
+        ArchivedElementCode.objects.using(db_alias).bulk_create(
+            ArchivedElementCode(version_id=version_id, code=code)
+            for code, _ in json.loads(zlib.decompress(bytes(payload)))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0007_elements_revision_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedElementCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100)),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_codes', to='dictionaries.dictionaryversion')),
+            ],
+            options={
+                'verbose_name': 'Код архивного элемента',
+                'verbose_name_plural': 'Коды архивных элементов',
+                'indexes': [models.Index(fields=['code', 'version'], name='archived_code_idx')],
+            },
+        ),
+        migrations.RunPython(
+            index_archived_codes, migrations.RunPython.noop,
+        ),
+    ]
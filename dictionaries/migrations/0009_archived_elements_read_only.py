@@ -0,0 +1,110 @@
+# Generated by Django 5.1 on 2026-10-19 14:20
+
+from django.db import migrations
+
+TRIGGER_NAMES = (
+    'dictionaries_element_archived_insert',
+    'dictionaries_element_archived_update',
+)
+
+SQLITE_TRIGGERS = tuple(
+    f'CREATE TRIGGER {name} BEFORE {event} ON {{element}} '
+    f'WHEN (SELECT archived FROM {{version}} WHERE id = NEW.version_id) '
+    f'BEGIN SELECT RAISE(ABORT, \'dictionary version is archived\'); END'
+    for name, event in zip(TRIGGER_NAMES, ('INSERT', 'UPDATE'))
+)
+
+# Блокирующее чтение версии дожидается фиксации параллельной архивации и
+# видит её результат.
+MYSQL_TRIGGERS = tuple(
+    f'CREATE TRIGGER {name} AFTER {event} ON {{element}} FOR EACH ROW '
+    f'BEGIN '
+    f'IF (SELECT archived FROM {{version}} WHERE id = NEW.version_id '
+    f'LOCK IN SHARE MODE) THEN '
+    f'SIGNAL SQLSTATE \'23000\' '
+    f'SET MESSAGE_TEXT = \'dictionary version is archived\'; '
+    f'END IF; '
+    f'END'
+    for name, event in zip(TRIGGER_NAMES, ('INSERT', 'UPDATE'))
+)
+
+POSTGRESQL_TRIGGERS = (
+    '''
+    CREATE OR REPLACE FUNCTION dictionaries_reject_archived_elements()
+    RETURNS trigger AS $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM {version} v
+            WHERE v.id IN (SELECT version_id FROM new_rows) AND v.archived
+            FOR SHARE
+        ) THEN
+            RAISE EXCEPTION 'dictionary version is archived'
+                USING ERRCODE = 'integrity_constraint_violation';
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    *(
+        f'CREATE TRIGGER {name} AFTER {event} ON {{element}} '
+        f'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+        f'EXECUTE FUNCTION dictionaries_reject_archived_elements()'
+        for name, event in zip(TRIGGER_NAMES, ('INSERT', 'UPDATE'))
+    ),
+)
+
+TRIGGERS = {
+    'sqlite': SQLITE_TRIGGERS,
+    'mysql': MYSQL_TRIGGERS,
+    'postgresql': POSTGRESQL_TRIGGERS,
+}
+
+
+def _tables(apps, schema_editor):
+    quote_name = schema_editor.connection.ops.quote_name
+    return {
+        'element': quote_name(
+            apps.get_model('dictionaries', 'DictionaryElement')._meta.db_table
+        ),
+        'version': quote_name(
+            apps.get_model('dictionaries', 'DictionaryVersion')._meta.db_table
+        ),
+    }
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in TRIGGERS:
+        raise NotImplementedError(
+            f'Триггеры архивных версий не поддерживаются для {vendor}.'
+        )
+    tables = _tables(apps, schema_editor)
+    for statement in TRIGGERS[vendor]:
+        schema_editor.execute(statement.format(**tables))
+
+
+def drop_triggers(apps, schema_editor):
+    tables = _tables(apps, schema_editor)
+    on_table = (
+        ' ON {element}' if schema_editor.connection.vendor == 'postgresql'
+        else ''
+    )
+    for name in TRIGGER_NAMES:
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS {name}{on_table}'.format(**tables)
+        )
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP FUNCTION IF EXISTS dictionaries_reject_archived_elements()'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0008_archived_element_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -1,4 +1,13 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+
+from .normalization import normalize_text
+
+# Исходные поля элемента и поля с их нормализованной формой.
+NORMALIZED_FIELDS = {
+    'code': 'code_normalized',
+    'value': 'value_normalized',
+}
 
 
 class Dictionary(models.Model):
@@ -42,8 +51,21 @@ class DictionaryVersion(models.Model):
      к которому относится версия (внешний ключ).
     - `version`: Название версии справочника (строка).
     - `start_date`: Дата начала действия версии (дата).
+    - `element_filter`: Сериализованный фильтр Блума по парам
+      `(code, value)` элементов версии (двоичные данные, опционально).
+    - `elements_revision`: Номер ревизии элементов (целое число).
+      Увеличивается триггерами базы данных в той же транзакции, что и любая
+      запись в таблицу элементов версии, включая `bulk_create()`,
+      `QuerySet.update()` и прямые SQL-запросы.
+    - `element_filter_revision`: Ревизия элементов, по которой построен
+      фильтр (целое число, опционально). Фильтр действителен, только пока
+      она совпадает с `elements_revision`.
+    - `archived`: Признак того, что элементы версии перенесены в архив
+      (`ArchivedElements`) (логическое значение).
 
     Методы:
+    - `save()`: Сохраняет версию в одной транзакции с событием журнала
+      изменений, которое записывает сигнал `post_save`.
     - `__str__()`: Возвращает название справочника и версию.
     """
     dictionary = models.ForeignKey(
@@ -51,16 +73,164 @@ class DictionaryVersion(models.Model):
     )
     version = models.CharField(max_length=50)
     start_date = models.DateField()
+    element_filter = models.BinaryField(null=True, editable=False)
+    elements_revision = models.PositiveIntegerField(
+        default=0, editable=False,
+    )
+    element_filter_revision = models.PositiveIntegerField(
+        null=True, editable=False,
+    )
+    archived = models.BooleanField(default=False, editable=False)
 
     class Meta:
         unique_together = ('dictionary', 'version', 'start_date')
         verbose_name = "Версия справочника"
         verbose_name_plural = "Версии справочников"
 
+    def save(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, using=using, **kwargs)
+
     def __str__(self):
         return f"{self.dictionary.name} - {self.version}"
 
 
+class DictionaryElementQuerySet(models.QuerySet):
+    """
+    Набор запросов элементов справочника.
+
+    Массовые операции не вызывают сигналы моделей, поэтому после
+    `bulk_create()`, `update()` (а значит, и `bulk_update()`) и `delete()`
+    изменение элементов обрабатывается так же, как при сохранении
+    отдельного элемента: нормализованные поля заполняются, в журнал
+    изменений пишется событие, а вставленные элементы добавляются в
+    фильтры Блума версий.
+
+    Удаление отслеживается в `delete()`, а не сигналом `post_delete`:
+    получатель сигнала не дал бы Django удалять элементы каскадом одним
+    запросом при удалении версии. Каскадное удаление покрывают триггеры
+    ревизии и событие `version_deleted`.
+    """
+
+    def normalized_match_exists(self, code, value):
+        """
+        Проверяет, есть ли элемент, совпадающий с `(code, value)` после
+        нормализации.
+
+        Поиск идёт по индексу нормализованных полей. Если нормализованная
+        строка не помещается в поле и была усечена, совпадение префикса
+        подтверждается сравнением полных нормализованных строк.
+        """
+        code, value = normalize_text(code), normalize_text(value)
+        candidates = self.filter(
+            code_normalized=self.model.truncate_normalized('code', code),
+            value_normalized=self.model.truncate_normalized('value', value),
+        )
+        if not (
+            self.model.is_truncated('code', code)
+            or self.model.is_truncated('value', value)
+        ):
+            return candidates.exists()
+        return any(
+            normalize_text(candidate_code) == code
+            and normalize_text(candidate_value) == value
+            for candidate_code, candidate_value in candidates.values_list(
+                'code', 'value'
+            ).iterator()
+        )
+
+    def _elements_changed(self, version_ids, pairs=None, revisions=None):
+        from .signals import schedule_elements_changed
+
+        for version_id in version_ids:
+            schedule_elements_changed(
+                version_id, self.db,
+                pairs=None if pairs is None else pairs[version_id],
+                start_revision=(revisions or {}).get(version_id),
+            )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize()
+        with transaction.atomic(using=self.db, savepoint=False):
+            # Ревизии читаются до вставки с блокировкой версий: по ним
+            # фильтры дополняются вставленными парами после фиксации.
+            revisions = dict(
+                DictionaryVersion.objects.using(self.db).select_for_update()
+                .filter(pk__in={obj.version_id for obj in objs})
+                .values_list('pk', 'elements_revision')
+            )
+            objs = super().bulk_create(objs, *args, **kwargs)
+            pairs = {}
+            for obj in objs:
+                pairs.setdefault(obj.version_id, []).append(
+                    (obj.code, obj.value)
+                )
+            self._elements_changed(pairs, pairs, revisions)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, fields = list(objs), list(fields)
+        for source, target in NORMALIZED_FIELDS.items():
+            if source in fields and target not in fields:
+                fields.append(target)
+        for obj in objs:
+            obj.normalize()
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    bulk_update.alters_data = True
+
+    def update(self, **kwargs):
+        # Строковые значения нормализуются сразу, а для выражений
+        # (например, F()) нормализованные поля пересчитываются после
+        # обновления по прочитанным из базы строкам.
+        renormalize = False
+        for source, target in NORMALIZED_FIELDS.items():
+            if source not in kwargs or target in kwargs:
+                continue
+            if isinstance(kwargs[source], str):
+                kwargs[target] = self.model.truncate_normalized(
+                    source, normalize_text(kwargs[source])
+                )
+            else:
+                renormalize = True
+
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True)) if renormalize else []
+            version_ids = set(
+                self.order_by().values_list('version_id', flat=True).distinct()
+            )
+            rows = super().update(**kwargs)
+            for field in ('version', 'version_id'):
+                if field in kwargs:
+                    new_version = kwargs[field]
+                    version_ids.add(getattr(new_version, 'pk', new_version))
+            if pks:
+                elements = self.model._default_manager.using(self.db)
+                elements.bulk_update(
+                    elements.filter(pk__in=pks).only('code', 'value'),
+                    list(NORMALIZED_FIELDS.values()),
+                )
+        self._elements_changed(version_ids)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            version_ids = set(
+                self.order_by().values_list('version_id', flat=True).distinct()
+            )
+            result = super().delete()
+            self._elements_changed(version_ids)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class DictionaryElement(models.Model):
     """
     Модель элемента справочника.
@@ -74,8 +244,20 @@ class DictionaryElement(models.Model):
     к которой относится элемент (внешний ключ).
     - `code`: Код элемента справочника (строка).
     - `value`: Значение элемента справочника (строка).
+    - `code_normalized`, `value_normalized`: Нормализованные код и
+      значение (см. `normalize_text`), усечённые до длины поля. Заполняются
+      автоматически перед сохранением, в `bulk_create()`, `bulk_update()` и
+      `QuerySet.update()` и используются для нестрогой проверки элементов.
+
+    Элементы архивной версии (см. `ArchivedElements`) изменять нельзя:
+    запись в такую версию отклоняется триггерами базы данных.
 
     Методы:
+    - `clean()`: Запрещает добавлять элементы в архивную версию.
+    - `save()`: Сохраняет элемент; если в `update_fields` указаны код или
+      значение, добавляет к ним соответствующие нормализованные поля.
+    - `delete()`: Удаляет элемент и отмечает изменение элементов версии.
+    - `normalize()`: Заполняет нормализованные поля по коду и значению.
     - `__str__()`: Возвращает код и значение элемента.
     """
     version = models.ForeignKey(
@@ -83,11 +265,196 @@ class DictionaryElement(models.Model):
     )
     code = models.CharField(max_length=100)
     value = models.CharField(max_length=300)
+    # Нормализация может удлинить строку (например, «ß» → «ss», а NFKC
+    # раскрывает некоторые символы до 18 букв), поэтому длина
+    # нормализованных полей больше исходных, а не поместившийся остаток
+    # отбрасывается (см. `truncate_normalized`).
+    code_normalized = models.CharField(
+        max_length=200, default='', editable=False,
+    )
+    value_normalized = models.CharField(
+        max_length=600, default='', editable=False,
+    )
+
+    objects = DictionaryElementQuerySet.as_manager()
 
     class Meta:
         unique_together = ('version', 'code')
+        indexes = [
+            models.Index(
+                fields=['version', 'code_normalized', 'value_normalized'],
+                name='element_normalized_idx',
+            ),
+            # unique_together начинается с version и не подходит для поиска
+            # версий по коду элемента.
+            models.Index(fields=['code', 'version'], name='element_code_idx'),
+        ]
         verbose_name = "Элемент справочника"
         verbose_name_plural = "Элементы справочников"
 
     def __str__(self):
         return f"{self.code}: {self.value}"
+
+    def clean(self):
+        if DictionaryVersion.objects.filter(
+            pk=self.version_id, archived=True
+        ).exists():
+            raise ValidationError({
+                'version': 'Версия архивирована, её элементы изменять нельзя.'
+            })
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        version_id = self.version_id
+        with transaction.atomic(using=using):
+            result = super().delete(using=using, keep_parents=keep_parents)
+            type(self).objects.using(using)._elements_changed({version_id})
+        return result
+
+    def save(self, *args, using=None, update_fields=None, **kwargs):
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            update_fields.update(
+                target for source, target in NORMALIZED_FIELDS.items()
+                if source in update_fields
+            )
+        # Событие журнала изменений пишется сигналом post_save и должно
+        # попасть в ту же транзакцию, что и сам элемент.
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(
+                *args, using=using, update_fields=update_fields, **kwargs
+            )
+
+    @classmethod
+    def truncate_normalized(cls, source, normalized):
+        field = cls._meta.get_field(NORMALIZED_FIELDS[source])
+        return normalized[:field.max_length]
+
+    @classmethod
+    def is_truncated(cls, source, normalized):
+        # Строка длиной ровно с поле неотличима от усечённой.
+        field = cls._meta.get_field(NORMALIZED_FIELDS[source])
+        return len(normalized) >= field.max_length
+
+    def normalize(self):
+        for source, target in NORMALIZED_FIELDS.items():
+            setattr(self, target, self.truncate_normalized(
+                source, normalize_text(getattr(self, source))
+            ))
+
+
+class ArchivedElements(models.Model):
+    """
+    Модель архива элементов версии справочника.
+
+    Элементы редко используемых старых версий переносятся из таблицы
+    `DictionaryElement` в один сжатый блок на версию, чтобы основная
+    таблица и её индексы оставались небольшими. Представления читают архив
+    прозрачно для клиентов.
+
+    Поля:
+    - `version`: Версия справочника, элементы которой хранятся в архиве
+      (первичный ключ).
+    - `payload`: Пары `[code, value]` в JSON, сжатые zlib (двоичные данные).
+    - `element_count`: Количество элементов в архиве (целое число).
+    - `archived_at`: Время архивации (дата и время).
+
+    Методы:
+    - `__str__()`: Возвращает версию и количество элементов.
+    """
+    version = models.OneToOneField(
+        DictionaryVersion, on_delete=models.CASCADE, primary_key=True,
+        related_name='archive',
+    )
+    payload = models.BinaryField()
+    element_count = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Архив элементов"
+        verbose_name_plural = "Архивы элементов"
+
+    def __str__(self):
+        return f"{self.version_id}: {self.element_count}"
+
+
+class ArchivedElementCode(models.Model):
+    """
+    Модель кода элемента архивной версии справочника.
+
+    Архив хранит элементы одним сжатым блоком, поэтому искать в нём
+    версии по коду элемента без распаковки нельзя. Эта таблица содержит
+    только пары `(code, version)` архивных версий и служит индексом для
+    обратного поиска по коду.
+
+    Поля:
+    - `version`: Архивная версия справочника (внешний ключ).
+    - `code`: Код элемента (строка).
+
+    Методы:
+    - `__str__()`: Возвращает версию и код элемента.
+    """
+    version = models.ForeignKey(
+        DictionaryVersion, on_delete=models.CASCADE,
+        related_name='archived_codes',
+    )
+    code = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['code', 'version'],
+                         name='archived_code_idx'),
+        ]
+        verbose_name = "Код архивного элемента"
+        verbose_name_plural = "Коды архивных элементов"
+
+    def __str__(self):
+        return f"{self.version_id}: {self.code}"
+
+
+class ChangeEvent(models.Model):
+    """
+    Модель события в журнале изменений справочников.
+
+    Журнал только дополняется: события создаются обработчиками сигналов при
+    изменении версий и элементов справочников и никогда не изменяются.
+    Идентификатор события монотонно возрастает и служит смещением, с
+    которого подписчик продолжает чтение ленты.
+
+    Поля:
+    - `kind`: Тип события (строка).
+    - `dictionary_id`: Идентификатор справочника (целое число).
+    - `version_id`: Идентификатор версии справочника (целое число).
+    - `version`: Название версии справочника (строка).
+    - `start_date`: Дата начала действия версии (дата).
+    - `created_at`: Время создания события (дата и время).
+
+    Методы:
+    - `__str__()`: Возвращает номер и тип события.
+    """
+    VERSION_CREATED = 'version_created'
+    VERSION_UPDATED = 'version_updated'
+    VERSION_DELETED = 'version_deleted'
+    ELEMENTS_CHANGED = 'elements_changed'
+    KIND_CHOICES = [
+        (VERSION_CREATED, 'Версия создана'),
+        (VERSION_UPDATED, 'Версия изменена'),
+        (VERSION_DELETED, 'Версия удалена'),
+        (ELEMENTS_CHANGED, 'Элементы изменены'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    dictionary_id = models.BigIntegerField()
+    version_id = models.BigIntegerField()
+    version = models.CharField(max_length=50)
+    start_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Событие изменения"
+        verbose_name_plural = "Журнал изменений"
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind}"
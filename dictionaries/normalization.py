@@ -0,0 +1,17 @@
+import unicodedata
+
+
+def normalize_text(value):
+    """
+    Приводит строку к нормализованной форме для нестрогого сравнения.
+
+    Строка приводится к форме Unicode NFKC и нижнему регистру
+    (`casefold`), буква «ё» заменяется на «е», пробельные символы по краям
+    удаляются, а последовательности пробелов внутри сжимаются до одного.
+
+    Пример:
+    - `normalize_text('  Ёлка\\u00a0 ЗЕЛЁНАЯ ')` → `'елка зеленая'`
+    """
+    value = unicodedata.normalize('NFKC', value).casefold()
+    value = value.replace('ё', 'е')
+    return ' '.join(value.split())
@@ -0,0 +1,72 @@
+import cbor2
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+def to_columns(data):
+    """
+    Преобразует `{"elements": [{"code": ..., "value": ...}, ...]}` в
+    колоночный вид `{"codes": [...], "values": [...]}`.
+
+    Остальные данные (например, сообщения об ошибках) возвращаются без
+    изменений.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('elements'), list):
+        return data
+    elements = data['elements']
+    return {
+        "codes": [element['code'] for element in elements],
+        "values": [element['value'] for element in elements],
+    }
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    JSON в колоночном виде: имена полей не повторяются в каждом элементе.
+
+    Выбирается заголовком `Accept: application/vnd.refbooks.columnar+json`
+    или параметром `?format=columnar`.
+    """
+    media_type = 'application/vnd.refbooks.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(
+            to_columns(data), accepted_media_type, renderer_context
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Ответ в формате MessagePack.
+
+    Выбирается заголовком `Accept: application/msgpack` или параметром
+    `?format=msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    """
+    Ответ в формате CBOR (RFC 8949).
+
+    Выбирается заголовком `Accept: application/cbor` или параметром
+    `?format=cbor`.
+    """
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data)
@@ -0,0 +1,121 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Реплика, выбранная для текущего контекста `read_from_replica()`, либо
+# основная база, если ни одна реплика не отвечает.
+_replica_alias = ContextVar('replica_alias', default=None)
+
+# Кэш состояния реплик: alias -> (доступна ли, время проверки).
+_replica_health = {}
+
+
+@contextmanager
+def read_from_replica(alias=None):
+    """
+    Контекст, в котором запросы на чтение направляются на реплику.
+
+    Реплика выбирается один раз при входе в контекст и используется для
+    всех запросов внутри него: реплики отстают от основной базы по-разному,
+    и ревизии, прочитанные с одной реплики, не должны сочетаться с
+    элементами, прочитанными с другой. Вложенный контекст наследует выбор
+    внешнего. Параметр `alias` позволяет продолжить чтение с уже выбранной
+    базы там, где контекст нужно открыть заново, например в генераторе
+    потокового ответа (см. `current_replica()`).
+
+    Вне этого контекста роутер отправляет все запросы в основную базу,
+    поэтому админка, миграции и запись данных не затрагиваются.
+    """
+    if alias is None:
+        alias = _replica_alias.get() or _choose_replica()
+    token = _replica_alias.set(alias)
+    try:
+        yield
+    finally:
+        _replica_alias.reset(token)
+
+
+def current_replica():
+    """
+    Возвращает базу, выбранную текущим контекстом `read_from_replica()`,
+    или `None` вне контекста.
+    """
+    return _replica_alias.get()
+
+
+def _choose_replica():
+    """
+    Выбирает случайную доступную реплику из `settings.DATABASE_REPLICAS`.
+    Если ни одна реплика не отвечает, возвращает основную базу.
+    """
+    replicas = list(getattr(settings, 'DATABASE_REPLICAS', []))
+    random.shuffle(replicas)
+    for alias in replicas:
+        if _is_healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def _is_healthy(alias):
+    """
+    Проверяет доступность реплики с кэшированием результата.
+
+    Реплика проверяется запросом `SELECT 1`: уже открытое соединение
+    могло оборваться, и одного `ensure_connection()` для проверки
+    недостаточно. Если проверка не прошла, соединение закрывается, чтобы
+    следующая проверка открыла новое. Результат хранится
+    `DATABASE_REPLICA_HEALTH_CHECK_INTERVAL` секунд, чтобы не проверять
+    реплику на каждый запрос.
+    """
+    interval = getattr(settings, 'DATABASE_REPLICA_HEALTH_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    cached = _replica_health.get(alias)
+    if cached is not None and now - cached[1] < interval:
+        return cached[0]
+
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        healthy = True
+    except DatabaseError:
+        healthy = False
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+
+    _replica_health[alias] = (healthy, now)
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Роутер баз данных для распределения чтения по репликам.
+
+    Чтение внутри `read_from_replica()` направляется на реплику, выбранную
+    при входе в контекст, — одну на весь контекст. Если ни одна реплика не
+    отвечает, запросы выполняются в основной базе. Запись, миграции и любые
+    запросы вне контекста всегда идут в основную базу (`default`).
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', [])}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', []):
+            return False
+        return None
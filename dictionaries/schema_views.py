@@ -0,0 +1,103 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+SCHEMA_CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.yaml': 'application/yaml',
+}
+
+# Кэш прочитанных файлов схемы: путь -> (mtime, содержимое, ETag).
+_schema_cache = {}
+
+
+def _load_schema(path):
+    """
+    Читает файл схемы, кэшируя содержимое до изменения файла.
+
+    Возвращает кортеж `(содержимое, ETag, время изменения)` или `None`,
+    если схема ещё не сгенерирована.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+    cached = _schema_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as schema_file:
+            content = schema_file.read()
+        etag = quote_etag(hashlib.sha256(content).hexdigest()[:32])
+        cached = _schema_cache[path] = (mtime, content, etag)
+
+    return cached[1], cached[2], cached[0]
+
+
+class StaticSchemaView(View):
+    """
+    Отдача заранее сгенерированной OpenAPI-схемы.
+
+    Файлы создаются командой `manage.py build_openapi_schema`. Ответ
+    содержит `ETag`, `Last-Modified` и `Cache-Control` с временем жизни
+    `settings.OPENAPI_SCHEMA_CACHE_MAX_AGE`, поэтому повторные запросы
+    получают `304 Not Modified`.
+
+    Если схема не сгенерирована, возвращается код состояния 404.
+    """
+
+    def get(self, request, format):
+        path = os.path.join(settings.OPENAPI_SCHEMA_DIR, f'openapi{format}')
+        schema = _load_schema(path)
+        if schema is None:
+            raise Http404(
+                'Схема не найдена. Выполните manage.py build_openapi_schema.'
+            )
+        content, etag, mtime = schema
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(mtime)
+        )
+        if response is None:
+            response = HttpResponse(
+                content, content_type=SCHEMA_CONTENT_TYPES[format]
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        patch_cache_control(
+            response, public=True,
+            max_age=settings.OPENAPI_SCHEMA_CACHE_MAX_AGE,
+        )
+        return response
+
+
+class SchemaUIView(View):
+    """
+    Страница Swagger UI или ReDoc без генерации схемы.
+
+    Шаблон drf-yasg отрисовывается без объекта схемы, а сама схема
+    загружается браузером по `SPEC_URL` из `SWAGGER_SETTINGS` и
+    `REDOC_SETTINGS`, то есть из статического файла.
+    """
+    renderer_class = SwaggerUIRenderer
+
+    def get(self, request):
+        renderer = self.renderer_class()
+        context = {'request': request}
+        renderer.set_context(context)
+        context['title'] = swagger_settings.DEFAULT_INFO.title
+        return HttpResponse(
+            render_to_string(renderer.template, context, request),
+            content_type='text/html; charset=utf-8',
+        )
+
+
+class RedocUIView(SchemaUIView):
+    renderer_class = ReDocRenderer
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Dictionary, DictionaryVersion, DictionaryElement
+from .models import (
+    ChangeEvent, Dictionary, DictionaryVersion, DictionaryElement,
+)
 
 
 class DictionarySerializer(serializers.ModelSerializer):
@@ -85,3 +87,85 @@ class DictionaryElementSerializer(serializers.ModelSerializer):
     class Meta:
         model = DictionaryElement
         fields = ['code', 'value']
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для событий журнала изменений.
+
+    Этот сериализатор преобразует экземпляры модели `ChangeEvent` в формат
+    JSON. Он используется в ленте изменений справочников.
+
+    Поля:
+    - `id`: Идентификатор события, он же смещение в ленте (целое число).
+    - `kind`: Тип события (строка).
+    - `dictionary_id`: Идентификатор справочника (целое число).
+    - `version_id`: Идентификатор версии (целое число).
+    - `version`: Версия справочника (строка).
+    - `start_date`: Дата начала действия версии (дата).
+    - `created_at`: Время события (дата и время).
+
+    Примеры:
+    - Преобразование экземпляра модели в JSON:
+      ```json
+      {
+        "id": 42,
+        "kind": "elements_changed",
+        "dictionary_id": 1,
+        "version_id": 3,
+        "version": "2.0",
+        "start_date": "2024-09-01",
+        "created_at": "2024-08-30T12:00:00Z"
+      }
+      ```
+    """
+    class Meta:
+        model = ChangeEvent
+        fields = [
+            'id', 'kind', 'dictionary_id', 'version_id', 'version',
+            'start_date', 'created_at',
+        ]
+
+
+class ElementLookupSerializer(serializers.Serializer):
+    """
+    Сериализатор для результатов поиска элемента по коду.
+
+    Этот сериализатор преобразует строки, полученные через `values()` по
+    модели `DictionaryElement`, в описание справочника и версии, в которой
+    найден элемент.
+
+    Поля:
+    - `refbook_id`: Идентификатор справочника (целое число).
+    - `refbook_code`: Код справочника (строка).
+    - `refbook_name`: Название справочника (строка).
+    - `version_id`: Идентификатор версии справочника (целое число).
+    - `version`: Версия справочника (строка).
+    - `start_date`: Дата начала действия версии (дата).
+    - `value`: Значение элемента в этой версии (строка, `null` для
+      архивной версии).
+    - `archived`: Признак архивной версии (логическое значение).
+
+    Примеры:
+    - Преобразование результата в JSON:
+      ```json
+      {
+        "refbook_id": 1,
+        "refbook_code": "001",
+        "refbook_name": "Пример справочника",
+        "version_id": 1,
+        "version": "1.0",
+        "start_date": "2022-01-01",
+        "value": "Пример значения",
+        "archived": false
+      }
+      ```
+    """
+    refbook_id = serializers.IntegerField(source='version__dictionary_id')
+    refbook_code = serializers.CharField(source='version__dictionary__code')
+    refbook_name = serializers.CharField(source='version__dictionary__name')
+    version_id = serializers.IntegerField()
+    version = serializers.CharField(source='version__version')
+    start_date = serializers.DateField(source='version__start_date')
+    value = serializers.CharField(allow_null=True)
+    archived = serializers.BooleanField()
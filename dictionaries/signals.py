@@ -0,0 +1,143 @@
+import logging
+import weakref
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import changefeed, element_filters
+from .models import ChangeEvent, DictionaryElement, DictionaryVersion
+
+logger = logging.getLogger(__name__)
+
+# Изменения элементов в текущей транзакции: соединение ->
+# {идентификатор версии: _PendingChange}.
+_pending = weakref.WeakKeyDictionary()
+
+
+class _PendingChange:
+    """
+    Изменения элементов версии в одной транзакции.
+
+    Поля:
+    - `event_id`: Идентификатор записанного события `elements_changed`.
+    - `start_revision`, `end_revision`: Ревизия элементов до первой и
+      после последней записи в транзакции.
+    - `pairs`: Пары `(code, value)` вставленных элементов или `None`, если
+      элементы также изменялись или удалялись.
+    """
+
+    def __init__(self, event_id, start_revision):
+        self.event_id = event_id
+        self.start_revision = start_revision
+        self.end_revision = None
+        self.pairs = []
+
+
+def _elements_committed(connection, version_id, change, using):
+    changes = _pending.get(connection, {})
+    if changes.get(version_id) is change:
+        del changes[version_id]
+    # Изменённые и удалённые пары из фильтра Блума не убрать, поэтому
+    # после таких изменений фильтр остаётся устаревшим до перестроения
+    # командой rebuild_element_filters, а проверка элементов идёт в базу.
+    if change.pairs is None:
+        return
+    try:
+        element_filters.add_to_element_filter(
+            version_id, change.pairs, change.start_revision,
+            change.end_revision, using,
+        )
+    except Exception:
+        # Ревизия элементов уже увеличена, поэтому необновлённый фильтр
+        # считается устаревшим и проверка элементов идёт в базу.
+        logger.exception('Не удалось обновить фильтр версии %s', version_id)
+
+
+def schedule_elements_changed(version_id, using, pairs=None,
+                              start_revision=None):
+    """
+    Отмечает изменение элементов версии в текущей транзакции.
+
+    Вызывается после записи. `pairs` — пары `(code, value)` вставленных
+    элементов или `None` для изменения и удаления; `start_revision` —
+    ревизия элементов до записи, если запись могла увеличить её больше
+    чем на единицу (например, `bulk_create()`).
+
+    Событие `elements_changed` записывается сразу, в транзакции изменения,
+    по одному на версию за транзакцию (например, при загрузке фикстур).
+    Если транзакция только добавляла элементы, после фиксации их пары
+    добавляются в фильтр Блума версии (см. `add_to_element_filter()`).
+
+    Принадлежность запомненного события к текущей транзакции проверяется
+    по самой строке события: она откатывается вместе с транзакцией или
+    точкой сохранения, в которой записана, и тогда событие и обработчик
+    `on_commit` создаются заново. После фиксации запись сбрасывает сам
+    обработчик.
+    """
+    connection = transaction.get_connection(using)
+    changes = _pending.setdefault(connection, {})
+    change = changes.get(version_id)
+    # Идентификатор откатанной строки SQLite может выдать повторно, поэтому
+    # сверяются и тип события, и версия.
+    if change is not None and not ChangeEvent.objects.using(using).filter(
+        pk=change.event_id, kind=ChangeEvent.ELEMENTS_CHANGED,
+        version_id=version_id,
+    ).exists():
+        change = None
+
+    if change is None:
+        event = changefeed.record_elements_changed(version_id, using)
+        change = changes[version_id] = _PendingChange(event.pk, start_revision)
+        transaction.on_commit(
+            partial(_elements_committed, connection, version_id, change,
+                    using),
+            using=using, robust=True,
+        )
+
+    if pairs is None:
+        change.pairs = None
+    elif change.pairs is not None:
+        change.pairs.extend(pairs)
+        # Запись уже заблокировала версию до конца транзакции, поэтому
+        # прочитанная ревизия учитывает только изменения этой транзакции.
+        change.end_revision = DictionaryVersion.objects.using(using).filter(
+            pk=version_id
+        ).values_list('elements_revision', flat=True).first()
+        if change.start_revision is None:
+            # Вставка одной строки увеличивает ревизию на единицу.
+            change.start_revision = change.end_revision - 1
+
+
+@receiver(post_save, sender=DictionaryVersion)
+def version_saved(sender, instance, created, using, **kwargs):
+    kind = (
+        ChangeEvent.VERSION_CREATED if created
+        else ChangeEvent.VERSION_UPDATED
+    )
+    changefeed.record_version_event(kind, instance, using)
+
+
+@receiver(post_delete, sender=DictionaryVersion)
+def version_deleted(sender, instance, using, **kwargs):
+    changefeed.record_version_event(
+        ChangeEvent.VERSION_DELETED, instance, using
+    )
+
+
+@receiver(pre_save, sender=DictionaryElement)
+def element_normalize(sender, instance, **kwargs):
+    # Сигнал, а не save(): loaddata сохраняет объекты в обход save().
+    instance.normalize()
+
+
+# Удаление элементов отслеживается в `DictionaryElement.delete()` и
+# `DictionaryElementQuerySet.delete()`: получатель `post_delete` запретил бы
+# быстрое каскадное удаление элементов вместе с версией.
+@receiver(post_save, sender=DictionaryElement)
+def element_changed(sender, instance, created, using, **kwargs):
+    schedule_elements_changed(
+        instance.version_id, using,
+        pairs=[(instance.code, instance.value)] if created else None,
+    )
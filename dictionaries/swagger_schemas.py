@@ -60,6 +60,12 @@ check_element_schema = swagger_auto_schema(
         openapi.Parameter(
             'version', openapi.IN_QUERY, description="Версия справочника (опционально)",
             type=openapi.TYPE_STRING, required=False
+        ),
+        openapi.Parameter(
+            'match', openapi.IN_QUERY,
+            description="Режим сравнения: exact (по умолчанию) или normalized — без учёта регистра, "
+                        "пробелов, формы Unicode и различия ё/е (опционально)",
+            type=openapi.TYPE_STRING, enum=['exact', 'normalized'], required=False
         )
     ],
     responses={
@@ -70,6 +76,131 @@ check_element_schema = swagger_auto_schema(
                 "application/json": {"exists": False}
             }
         ),
+        400: "Неизвестный режим сравнения",
         404: "Версия справочника не найдена"
     }
 )
+
+bundle_schema = swagger_auto_schema(
+    manual_parameters=[
+        openapi.Parameter(
+            'codes', openapi.IN_QUERY, description="Коды справочников через запятую (обязательно)",
+            type=openapi.TYPE_STRING, required=True
+        ),
+        openapi.Parameter(
+            'date', openapi.IN_QUERY, description="Дата в формате ГГГГ-ММ-ДД (опционально)",
+            type=openapi.TYPE_STRING, required=False
+        ),
+        openapi.Parameter(
+            'known', openapi.IN_QUERY, description="Отпечатки разделов, уже сохранённых клиентом, через запятую (опционально)",
+            type=openapi.TYPE_STRING, required=False
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="Элементы текущих версий справочников",
+            examples={
+                "application/json": {
+                    "date": "2024-08-30",
+                    "missing": ["003"],
+                    "refbooks": [
+                        {
+                            "id": 1, "code": "001", "version": "1.0", "start_date": "2024-01-01",
+                            "fingerprint": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                            "elements": [{"code": "001", "value": "Пример элемента 1"}]
+                        },
+                        {
+                            "id": 2, "code": "002", "version": "2.0", "start_date": "2024-03-01",
+                            "fingerprint": "60303ae22b998861bce3b28f33eec1be758a213c86c93c076dbe9f558c11c752",
+                            "unchanged": True
+                        }
+                    ]
+                }
+            }
+        ),
+        400: "Не указаны коды справочников или неверный формат даты."
+    }
+)
+
+change_feed_schema = swagger_auto_schema(
+    manual_parameters=[
+        openapi.Parameter(
+            'after', openapi.IN_QUERY, description="Смещение: идентификатор последнего полученного события (опционально)",
+            type=openapi.TYPE_INTEGER, required=False
+        ),
+        openapi.Parameter(
+            'wait', openapi.IN_QUERY, description="Сколько секунд ждать новых событий (опционально)",
+            type=openapi.TYPE_INTEGER, required=False
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="События журнала изменений",
+            examples={
+                "application/json": {
+                    "events": [
+                        {
+                            "id": 42, "kind": "elements_changed", "dictionary_id": 1, "version_id": 3,
+                            "version": "2.0", "start_date": "2024-09-01", "created_at": "2024-08-30T12:00:00Z"
+                        }
+                    ],
+                    "next": 42
+                }
+            }
+        ),
+        400: "Неверное значение параметра after или wait."
+    }
+)
+
+change_stream_schema = swagger_auto_schema(
+    manual_parameters=[
+        openapi.Parameter(
+            'after', openapi.IN_QUERY, description="Смещение, если не передан заголовок Last-Event-ID (опционально)",
+            type=openapi.TYPE_INTEGER, required=False
+        )
+    ],
+    responses={
+        200: "Поток событий в формате text/event-stream",
+        400: "Неверное значение параметра after."
+    }
+)
+
+element_lookup_schema = swagger_auto_schema(
+    manual_parameters=[
+        openapi.Parameter(
+            'code', openapi.IN_QUERY, description="Код элемента справочника (обязательно)",
+            type=openapi.TYPE_STRING, required=True
+        ),
+        openapi.Parameter(
+            'after', openapi.IN_QUERY, description="Идентификатор версии из поля next предыдущей страницы (опционально)",
+            type=openapi.TYPE_INTEGER, required=False
+        ),
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY, description="Размер страницы (опционально)",
+            type=openapi.TYPE_INTEGER, required=False
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="Справочники и версии, содержащие элемент",
+            examples={
+                "application/json": {
+                    "matches": [
+                        {
+                            "refbook_id": 1, "refbook_code": "001", "refbook_name": "Справочник 1",
+                            "version_id": 1, "version": "1.0", "start_date": "2024-01-01",
+                            "value": "Пример элемента 1", "archived": False
+                        },
+                        {
+                            "refbook_id": 1, "refbook_code": "001", "refbook_name": "Справочник 1",
+                            "version_id": 7, "version": "0.9", "start_date": "2022-01-01",
+                            "value": None, "archived": True
+                        }
+                    ],
+                    "next": None
+                }
+            }
+        ),
+        400: "Не указан код элемента или неверные параметры страницы."
+    }
+)
@@ -1,8 +1,37 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+import brotli
+import cbor2
+import msgpack
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import (
+    IntegrityError, OperationalError, connection, connections, transaction,
+)
+from django.db.utils import ConnectionHandler
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.utils import timezone
-from .models import Dictionary, DictionaryElement, DictionaryVersion
+from . import archive, changefeed, element_filters, routers, schema_views
+from .bloom import BloomFilter
+from .compression import preferred_encoding
+from .normalization import normalize_text
+from .models import (
+    ArchivedElementCode, ArchivedElements, ChangeEvent, Dictionary,
+    DictionaryElement, DictionaryVersion,
+)
 
 
 class DictionaryAPITests(TestCase):
@@ -80,3 +109,1069 @@ class DictionaryAPITests(TestCase):
             f'?code=001&value=Example&version=nonexistent_version')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data, {"exists": False})
+
+
+class BundleAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.now().date()
+
+        self.first = Dictionary.objects.create(code='first', name='First')
+        old = DictionaryVersion.objects.create(
+            dictionary=self.first, version='1.0',
+            start_date=today - timezone.timedelta(days=30))
+        current = DictionaryVersion.objects.create(
+            dictionary=self.first, version='2.0',
+            start_date=today - timezone.timedelta(days=1))
+        DictionaryElement.objects.create(version=old, code='1', value='Old')
+        DictionaryElement.objects.create(version=current, code='2', value='B')
+        DictionaryElement.objects.create(version=current, code='1', value='A')
+
+        self.second = Dictionary.objects.create(code='second', name='Second')
+        version = DictionaryVersion.objects.create(
+            dictionary=self.second, version='1.0',
+            start_date=today - timezone.timedelta(days=5))
+        DictionaryElement.objects.create(version=version, code='X',
+                                         value='Икс')
+
+    def get_bundle(self, query, **extra):
+        response = self.client.get(f'/refbooks/bundle/{query}', **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_bundle_returns_current_versions(self):
+        response, content = self.get_bundle('?codes=first,second,unknown')
+        data = json.loads(content)
+
+        self.assertEqual(data['missing'], ['unknown'])
+        self.assertEqual(
+            [(section['code'], section['version'])
+             for section in data['refbooks']],
+            [('first', '2.0'), ('second', '1.0')])
+        self.assertEqual(data['refbooks'][0]['elements'], [
+            {'code': '1', 'value': 'A'}, {'code': '2', 'value': 'B'}])
+        self.assertEqual(data['refbooks'][1]['elements'],
+                         [{'code': 'X', 'value': 'Икс'}])
+
+    def test_bundle_with_date(self):
+        date = (timezone.now() - timezone.timedelta(days=10)).date()
+        _, content = self.get_bundle(f'?codes=first,second&date={date}')
+        data = json.loads(content)
+
+        self.assertEqual(data['missing'], ['second'])
+        self.assertEqual(data['refbooks'][0]['version'], '1.0')
+
+    def test_bundle_fingerprint_changes_with_elements(self):
+        _, content = self.get_bundle('?codes=second')
+        before = json.loads(content)['refbooks'][0]['fingerprint']
+
+        DictionaryElement.objects.filter(code='X').update(value='Другое')
+        _, content = self.get_bundle('?codes=second')
+        after = json.loads(content)['refbooks'][0]['fingerprint']
+
+        self.assertNotEqual(before, after)
+
+    def test_bundle_gzip(self):
+        response, content = self.get_bundle(
+            '?codes=first', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(content))
+        self.assertEqual(len(data['refbooks'][0]['elements']), 2)
+
+    def test_bundle_fingerprint_precedes_elements(self):
+        _, content = self.get_bundle('?codes=second')
+        section = json.loads(content)['refbooks'][0]
+        self.assertEqual(list(section)[-2:], ['fingerprint', 'elements'])
+
+    def test_bundle_skips_known_sections(self):
+        _, content = self.get_bundle('?codes=first,second')
+        first, second = json.loads(content)['refbooks']
+
+        _, content = self.get_bundle(
+            f'?codes=first,second&known={first["fingerprint"]}')
+        data = json.loads(content)
+        self.assertEqual(data['refbooks'][0], {
+            **{key: first[key] for key in first if key != 'elements'},
+            'unchanged': True,
+        })
+        self.assertEqual(data['refbooks'][1], second)
+
+    def test_bundle_deduplicates_codes(self):
+        _, content = self.get_bundle('?codes=first,second,first')
+        data = json.loads(content)
+        self.assertEqual([section['code'] for section in data['refbooks']],
+                         ['first', 'second'])
+
+    def test_bundle_gzip_rejected(self):
+        response, content = self.get_bundle(
+            '?codes=first', HTTP_ACCEPT_ENCODING='br, gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(json.loads(content)['refbooks']), 1)
+
+    def test_bundle_chunked_elements(self):
+        with mock.patch('dictionaries.views.BUNDLE_CHUNK_SIZE', 1):
+            _, content = self.get_bundle('?codes=first,second')
+        data = json.loads(content)
+        self.assertEqual(len(data['refbooks'][0]['elements']), 2)
+
+    def test_bundle_requires_codes(self):
+        response = self.client.get('/refbooks/bundle/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bundle_invalid_date(self):
+        response = self.client.get('/refbooks/bundle/?codes=first&date=bad')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CHANGE_FEED_SETTLE_DELAY=0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dictionary = Dictionary.objects.create(code='feed', name='Feed')
+        self.version = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='1.0',
+            start_date=timezone.now().date())
+
+    def kinds(self):
+        return list(ChangeEvent.objects.values_list('kind', 'version_id'))
+
+    def test_version_events(self):
+        self.version.version = '1.1'
+        self.version.save()
+        version_id = self.version.pk
+        self.version.delete()
+
+        self.assertEqual(self.kinds(), [
+            (ChangeEvent.VERSION_CREATED, version_id),
+            (ChangeEvent.VERSION_UPDATED, version_id),
+            (ChangeEvent.VERSION_DELETED, version_id),
+        ])
+
+    def test_element_changes_coalesced_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for code in ('1', '2', '3'):
+                    DictionaryElement.objects.create(
+                        version=self.version, code=code, value=code)
+
+        self.assertEqual(self.kinds()[1:], [
+            (ChangeEvent.ELEMENTS_CHANGED, self.version.pk)])
+
+    def test_rolled_back_element_changes_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    DictionaryElement.objects.create(
+                        version=self.version, code='1', value='1')
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                DictionaryElement.objects.create(
+                    version=self.version, code='2', value='2')
+
+        self.assertEqual(self.kinds()[1:], [
+            (ChangeEvent.ELEMENTS_CHANGED, self.version.pk)])
+
+    def test_savepoint_rollback_keeps_transaction_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        DictionaryElement.objects.create(
+                            version=self.version, code='1', value='1')
+                        raise ValueError
+                except ValueError:
+                    pass
+                DictionaryElement.objects.create(
+                    version=self.version, code='2', value='2')
+                DictionaryElement.objects.create(
+                    version=self.version, code='3', value='3')
+
+        self.assertEqual(self.kinds()[1:], [
+            (ChangeEvent.ELEMENTS_CHANGED, self.version.pk)])
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.element_filter_revision,
+                         self.version.elements_revision)
+
+    def test_element_deletes_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.bulk_create([
+                DictionaryElement(version=self.version, code=code, value=code)
+                for code in ('1', '2')
+            ])
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.get(code='1').delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.filter(code='2').delete()
+
+        self.assertEqual(self.kinds()[1:], [
+            (ChangeEvent.ELEMENTS_CHANGED, self.version.pk)] * 3)
+
+    def test_version_delete_cascades_elements_in_one_query(self):
+        DictionaryElement.objects.bulk_create([
+            DictionaryElement(version=self.version, code=str(index),
+                              value=str(index))
+            for index in range(200)
+        ])
+        table = DictionaryElement._meta.db_table
+        version_id = self.version.pk
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.version.delete()
+
+        element_queries = [
+            query['sql'] for query in queries
+            if table in query['sql'] and 'DELETE' in query['sql']
+        ]
+        self.assertEqual(len(element_queries), 1)
+        self.assertLess(len(queries), 15)
+        self.assertFalse(DictionaryElement.objects.exists())
+        self.assertEqual(self.kinds()[-1],
+                         (ChangeEvent.VERSION_DELETED, version_id))
+
+    def test_events_written_in_change_transaction(self):
+        with transaction.atomic():
+            self.version.save()
+            DictionaryElement.objects.create(
+                version=self.version, code='1', value='1')
+            self.assertEqual(self.kinds()[1:], [
+                (ChangeEvent.VERSION_UPDATED, self.version.pk),
+                (ChangeEvent.ELEMENTS_CHANGED, self.version.pk),
+            ])
+
+        try:
+            with transaction.atomic():
+                self.version.save()
+                DictionaryElement.objects.create(
+                    version=self.version, code='2', value='2')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(len(self.kinds()), 3)
+
+    def test_fresh_events_held_back(self):
+        first = ChangeEvent.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.version.save()
+        cache.clear()
+
+        with override_settings(CHANGE_FEED_SETTLE_DELAY=60):
+            response = self.client.get('/refbooks/changes/')
+        self.assertEqual(response.data['events'], [])
+        self.assertEqual(response.data['next'], 0)
+
+        ChangeEvent.objects.filter(pk=first.pk).update(
+            created_at=timezone.now() - timezone.timedelta(minutes=5))
+        with override_settings(CHANGE_FEED_SETTLE_DELAY=60):
+            response = self.client.get('/refbooks/changes/')
+        self.assertEqual(response.data['next'], first.pk)
+
+    def test_feed_with_offset(self):
+        first = ChangeEvent.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.create(
+                version=self.version, code='1', value='1')
+        cache.clear()
+
+        response = self.client.get('/refbooks/changes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['events']), 2)
+
+        response = self.client.get(f'/refbooks/changes/?after={first.pk}')
+        self.assertEqual(
+            [event['kind'] for event in response.data['events']],
+            [ChangeEvent.ELEMENTS_CHANGED])
+        self.assertEqual(response.data['next'],
+                         response.data['events'][0]['id'])
+
+        response = self.client.get(
+            f'/refbooks/changes/?after={response.data["next"]}')
+        self.assertEqual(response.data['events'], [])
+
+    def test_long_poll_waits_on_notifier_without_connection(self):
+        latest = ChangeEvent.objects.get().pk
+        with mock.patch.object(
+            changefeed.notifier, 'wait', return_value=False,
+        ) as wait, mock.patch.object(
+            changefeed, 'release_connections',
+        ) as release_connections:
+            response = self.client.get(
+                f'/refbooks/changes/?after={latest}&wait=5')
+        self.assertEqual(response.data['events'], [])
+        release_connections.assert_called_once_with()
+        self.assertEqual(wait.call_args.args[0], latest)
+
+    def test_feed_invalid_offset(self):
+        response = self.client.get('/refbooks/changes/?after=-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CHANGE_FEED_STREAM_TIMEOUT=0)
+    def test_stream_resumes_from_last_event_id(self):
+        first = ChangeEvent.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.version.save()
+
+        response = self.client.get('/refbooks/changes/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(f'id: {first.pk}\nevent: version_created\n', content)
+        self.assertIn('event: version_updated', content)
+
+        response = self.client.get('/refbooks/changes/stream/',
+                                   HTTP_LAST_EVENT_ID=str(first.pk))
+        content = b''.join(response.streaming_content).decode()
+        self.assertNotIn('event: version_created', content)
+        self.assertIn('event: version_updated', content)
+
+
+@override_settings(CHANGE_FEED_POLL_INTERVAL=0.01)
+class ChangeNotifierTests(SimpleTestCase):
+    def test_wakes_waiters_and_stops_when_idle(self):
+        notifier = changefeed.ChangeNotifier()
+        with mock.patch.object(changefeed, 'latest_event_id', return_value=5):
+            self.assertTrue(notifier.wait(4, timeout=5))
+            self.assertFalse(notifier.wait(5, timeout=0.05))
+            thread = notifier._thread
+            if thread is not None:
+                thread.join(timeout=5)
+        self.assertIsNone(notifier._thread)
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_contains_added_pairs(self):
+        element_filter = BloomFilter.for_capacity(1000)
+        for index in range(1000):
+            element_filter.add(str(index), f'value {index}')
+
+        restored = BloomFilter.from_bytes(element_filter.to_bytes())
+        for index in range(1000):
+            self.assertIn((str(index), f'value {index}'), restored)
+
+        false_positives = sum(
+            (str(index), f'value {index}') in restored
+            for index in range(1000, 11000)
+        )
+        self.assertLess(false_positives, 300)
+
+
+class CheckElementFilterTests(TestCase):
+    def setUp(self):
+        element_filters._filters.clear()
+        self.addCleanup(element_filters._filters.clear)
+        self.client = APIClient()
+        self.dictionary = Dictionary.objects.create(code='bloom',
+                                                    name='Bloom')
+        self.version = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='1.0',
+            start_date=timezone.now().date())
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.create(version=self.version,
+                                             code='001', value='Example')
+        self.url = f'/refbooks/{self.dictionary.id}/check-element/'
+
+    def check(self, code, value):
+        response = self.client.get(self.url, {'code': code, 'value': value})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['exists']
+
+    def test_filter_built_on_commit(self):
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.element_filter_revision,
+                         self.version.elements_revision)
+        self.assertIsNotNone(self.version.element_filter)
+
+    def test_negative_answered_without_element_query(self):
+        self.assertFalse(self.check('002', 'Missing'))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check('003', 'Missing'))
+        with self.assertNumQueries(2):
+            self.assertTrue(self.check('001', 'Example'))
+
+    def test_filter_rebuilt_after_element_change(self):
+        self.assertFalse(self.check('002', 'New'))
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.create(version=self.version,
+                                             code='002', value='New')
+        self.assertTrue(self.check('002', 'New'))
+
+    def test_bulk_create_rebuilds_filter(self):
+        self.assertFalse(self.check('b', 'B'))
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.bulk_create([
+                DictionaryElement(version=self.version, code='b', value='B'),
+            ])
+        self.assertTrue(self.check('b', 'B'))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check('c', 'C'))
+
+    def test_raw_insert_makes_filter_stale(self):
+        self.assertFalse(self.check('b', 'B'))
+        table = DictionaryElement._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (version_id, code, value, '
+                f'code_normalized, value_normalized) '
+                f'VALUES (%s, %s, %s, %s, %s)',
+                [self.version.pk, 'b', 'B', 'b', 'b'],
+            )
+        self.assertTrue(self.check('b', 'B'))
+
+    def test_failed_filter_update_fails_open(self):
+        with mock.patch.object(
+            element_filters, 'add_to_element_filter',
+            side_effect=OperationalError('locked'),
+        ), self.assertLogs('dictionaries.signals', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                DictionaryElement.objects.create(version=self.version,
+                                                 code='002', value='New')
+        self.assertTrue(self.check('002', 'New'))
+
+
+    def test_inserts_added_without_rebuild(self):
+        self.check('001', 'Example')
+        with mock.patch.object(
+            element_filters, 'rebuild_element_filters',
+        ) as rebuild, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for code in ('002', '003'):
+                    DictionaryElement.objects.create(
+                        version=self.version, code=code, value='New')
+            DictionaryElement.objects.bulk_create([
+                DictionaryElement(version=self.version, code=code, value='B')
+                for code in ('b1', 'b2')
+            ])
+        rebuild.assert_not_called()
+
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.element_filter_revision,
+                         self.version.elements_revision)
+        for code, value in (('002', 'New'), ('003', 'New'), ('b2', 'B')):
+            self.assertTrue(self.check(code, value))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check('004', 'Missing'))
+
+    def test_updates_and_deletes_leave_filter_stale(self):
+        with mock.patch.object(
+            element_filters, 'rebuild_element_filters',
+        ) as rebuild, self.captureOnCommitCallbacks(execute=True):
+            element = DictionaryElement.objects.get()
+            element.value = 'Changed'
+            element.save()
+        rebuild.assert_not_called()
+        self.version.refresh_from_db()
+        self.assertNotEqual(self.version.element_filter_revision,
+                            self.version.elements_revision)
+        self.assertTrue(self.check('001', 'Changed'))
+        self.assertFalse(self.check('001', 'Example'))
+
+        call_command('rebuild_element_filters', '--stale',
+                     stdout=io.StringIO())
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.element_filter_revision,
+                         self.version.elements_revision)
+        self.assertFalse(self.check('001', 'Example'))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check('002', 'Missing'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.filter(code='001').delete()
+        self.version.refresh_from_db()
+        self.assertNotEqual(self.version.element_filter_revision,
+                            self.version.elements_revision)
+        self.assertFalse(self.check('001', 'Changed'))
+
+    def test_concurrent_write_leaves_filter_stale(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            DictionaryElement.objects.create(version=self.version,
+                                             code='002', value='New')
+        # Другая транзакция изменила элементы до обработчика on_commit.
+        DictionaryVersion.objects.filter(pk=self.version.pk).update(
+            elements_revision=F('elements_revision') + 1)
+        for callback in callbacks:
+            callback()
+
+        self.version.refresh_from_db()
+        self.assertNotEqual(self.version.element_filter_revision,
+                            self.version.elements_revision)
+        self.assertTrue(self.check('002', 'New'))
+
+    def test_saturated_filter_rebuilt_with_more_capacity(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DictionaryElement.objects.bulk_create([
+                DictionaryElement(version=self.version, code=str(index),
+                                  value='Bulk')
+                for index in range(500)
+            ])
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.element_filter_revision,
+                         self.version.elements_revision)
+        element_filter = BloomFilter.from_bytes(self.version.element_filter)
+        self.assertFalse(element_filter.is_saturated())
+        self.assertGreaterEqual(
+            element_filter.size,
+            BloomFilter.for_capacity(1000).size)
+
+
+class NormalizedMatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dictionary = Dictionary.objects.create(code='norm', name='Norm')
+        version = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='1.0',
+            start_date=timezone.now().date())
+        DictionaryElement.objects.create(version=version, code='AB-1',
+                                         value='Зелёная  Ёлка')
+        self.url = f'/refbooks/{self.dictionary.id}/check-element/'
+
+    def check(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text('  Зелёная\u00a0 ЁЛКА '),
+                         'зеленая елка')
+        self.assertEqual(normalize_text('е\u0308'), 'е')
+
+    def test_normalized_columns_filled_on_save(self):
+        element = DictionaryElement.objects.get()
+        self.assertEqual(element.code_normalized, 'ab-1')
+        self.assertEqual(element.value_normalized, 'зеленая елка')
+
+    def test_save_with_update_fields_renormalizes(self):
+        element = DictionaryElement.objects.get()
+        element.value = 'Новая Ёлка'
+        element.save(update_fields=['value'])
+        element.refresh_from_db()
+        self.assertEqual(element.value_normalized, 'новая елка')
+
+        response = self.check(code='AB-1', value='новая елка',
+                              match='normalized')
+        self.assertEqual(response.data, {"exists": True})
+
+    def test_normalized_match(self):
+        response = self.check(code='ab-1 ', value='зеленая ЕЛКА',
+                              match='normalized')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"exists": True})
+
+        response = self.check(code='ab-1', value='зеленая елка')
+        self.assertEqual(response.data, {"exists": False})
+
+    def test_normalized_match_nfd(self):
+        value = 'Зел\u0435\u0308ная \u0415\u0308лка'
+        response = self.check(code='AB-1', value=value, match='normalized')
+        self.assertEqual(response.data, {"exists": True})
+
+    def test_bulk_paths_fill_normalized_columns(self):
+        version = DictionaryVersion.objects.get()
+        DictionaryElement.objects.bulk_create([
+            DictionaryElement(version=version, code='B', value='Ёж'),
+        ])
+        response = self.check(code='b', value='еж', match='normalized')
+        self.assertEqual(response.data, {"exists": True})
+
+        DictionaryElement.objects.filter(code='B').update(value='Ёлка')
+        response = self.check(code='b', value='елка', match='normalized')
+        self.assertEqual(response.data, {"exists": True})
+
+        DictionaryElement.objects.filter(code='B').update(code=Upper('value'))
+        element = DictionaryElement.objects.get(value='Ёлка')
+        self.assertEqual(element.code_normalized, 'елка')
+
+    def test_long_normalized_values_truncated(self):
+        # NFKC раскрывает «ﷺ» в 18 символов.
+        version = DictionaryVersion.objects.get()
+        for code in ('L1', 'L2'):
+            DictionaryElement.objects.create(
+                version=version, code=code, value='\ufdfa' * 300)
+        element = DictionaryElement.objects.get(code='L1')
+        self.assertEqual(len(element.value_normalized), 600)
+
+        expanded = normalize_text('\ufdfa' * 300)
+        response = self.check(code='l1', value=expanded, match='normalized')
+        self.assertEqual(response.data, {"exists": True})
+        response = self.check(code='l1', value=expanded[:-1] + 'x',
+                              match='normalized')
+        self.assertEqual(response.data, {"exists": False})
+
+    def test_unknown_match_mode(self):
+        response = self.check(code='AB-1', value='x', match='fuzzy')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ElementLookupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        first = Dictionary.objects.create(code='first', name='First')
+        second = Dictionary.objects.create(code='second', name='Second')
+        for dictionary, version, days in ((first, '2.0', 1),
+                                          (first, '1.0', 30),
+                                          (second, '1.0', 5)):
+            version = DictionaryVersion.objects.create(
+                dictionary=dictionary, version=version,
+                start_date=timezone.now() - timezone.timedelta(days=days))
+            DictionaryElement.objects.create(
+                version=version, code='X', value=f'{dictionary.code} X')
+            DictionaryElement.objects.create(
+                version=version, code='Y', value='Other')
+
+    def test_lookup_by_code(self):
+        response = self.client.get('/refbooks/lookup/?code=X')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(match['refbook_code'], match['version'], match['value'])
+             for match in response.data['matches']],
+            [('first', '2.0', 'first X'), ('first', '1.0', 'first X'),
+             ('second', '1.0', 'second X')])
+        self.assertIsNone(response.data['next'])
+
+    def test_lookup_pages(self):
+        seen = []
+        after = 0
+        while after is not None:
+            response = self.client.get(
+                '/refbooks/lookup/', {'code': 'X', 'after': after, 'limit': 2})
+            seen.extend(match['version_id']
+                        for match in response.data['matches'])
+            after = response.data['next']
+        self.assertEqual(seen, sorted(
+            DictionaryElement.objects.filter(code='X').values_list(
+                'version_id', flat=True)))
+
+    @override_settings(ELEMENT_LOOKUP_MAX_PAGE_SIZE=1)
+    def test_lookup_page_size_capped(self):
+        response = self.client.get('/refbooks/lookup/?code=X&limit=1000')
+        self.assertEqual(len(response.data['matches']), 1)
+        self.assertEqual(response.data['next'],
+                         response.data['matches'][0]['version_id'])
+
+    def test_lookup_invalid_page(self):
+        response = self.client.get('/refbooks/lookup/?code=X&limit=-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookup_unknown_code(self):
+        response = self.client.get('/refbooks/lookup/?code=Z')
+        self.assertEqual(response.data, {"matches": [], "next": None})
+
+    def test_lookup_requires_code(self):
+        response = self.client.get('/refbooks/lookup/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ElementsFormatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dictionary = Dictionary.objects.create(code='fmt', name='Fmt')
+        self.version = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='1.0',
+            start_date=timezone.now().date())
+        for code, value in (('1', 'Один'), ('2', 'Два')):
+            DictionaryElement.objects.create(version=self.version,
+                                             code=code, value=value)
+        self.url = f'/refbooks/{self.dictionary.id}/elements/'
+        self.expected = {"elements": [{"code": "1", "value": "Один"},
+                                      {"code": "2", "value": "Два"}]}
+
+    def test_columnar_json(self):
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/vnd.refbooks.columnar+json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content),
+                         {"codes": ["1", "2"], "values": ["Один", "Два"]})
+
+    def test_msgpack(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.expected)
+
+    def test_cbor(self):
+        response = self.client.get(self.url, {'format': 'cbor'})
+        self.assertEqual(response['Content-Type'], 'application/cbor')
+        self.assertEqual(cbor2.loads(response.content), self.expected)
+
+    def test_compressed_body_cached_per_revision(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept, Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(brotli.decompress(response.content)),
+                         self.expected)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url,
+                                       HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(json.loads(brotli.decompress(response.content)),
+                         self.expected)
+
+        DictionaryElement.objects.filter(code='2').delete()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(msgpack.unpackb(gzip.decompress(response.content)),
+                         {"elements": [{"code": "1", "value": "Один"}]})
+
+    def test_compressed_body_invalidated_by_bulk_writes(self):
+        def get_elements():
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br')
+            return json.loads(brotli.decompress(response.content))['elements']
+
+        self.assertEqual(len(get_elements()), 2)
+
+        DictionaryElement.objects.filter(code='1').update(value='Первый')
+        self.assertEqual(get_elements()[0]['value'], 'Первый')
+
+        DictionaryElement.objects.bulk_create([
+            DictionaryElement(version=self.version, code='3', value='Три'),
+        ])
+        self.assertEqual(len(get_elements()), 3)
+
+        table = DictionaryElement._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE code = %s', ['3'])
+        self.assertEqual(len(get_elements()), 2)
+
+    def test_preferred_encoding(self):
+        self.assertEqual(preferred_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(preferred_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(preferred_encoding('*'), 'br')
+        self.assertIsNone(preferred_encoding('identity'))
+        self.assertIsNone(preferred_encoding(''))
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        archive._cache.clear()
+        self.addCleanup(archive._cache.clear)
+        element_filters._filters.clear()
+        self.addCleanup(element_filters._filters.clear)
+        self.client = APIClient()
+        today = timezone.now().date()
+        self.dictionary = Dictionary.objects.create(code='arch', name='Arch')
+        self.old = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='1.0',
+            start_date=today - timezone.timedelta(days=800))
+        self.current = DictionaryVersion.objects.create(
+            dictionary=self.dictionary, version='2.0',
+            start_date=today - timezone.timedelta(days=400))
+        with self.captureOnCommitCallbacks(execute=True):
+            for version in (self.old, self.current):
+                DictionaryElement.objects.create(
+                    version=version, code='1', value=f'Ёж {version.version}')
+                DictionaryElement.objects.create(
+                    version=version, code='2', value='Два')
+        self.events_before = ChangeEvent.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_versions', stdout=io.StringIO())
+        self.old.refresh_from_db()
+
+    def test_only_superseded_versions_archived(self):
+        self.assertTrue(self.old.archived)
+        self.assertFalse(
+            DictionaryVersion.objects.get(pk=self.current.pk).archived)
+        self.assertEqual(ArchivedElements.objects.get().element_count, 2)
+        self.assertFalse(
+            DictionaryElement.objects.filter(version=self.old).exists())
+        self.assertEqual(
+            DictionaryElement.objects.filter(version=self.current).count(),
+            2)
+
+    def test_elements_view_reads_archive(self):
+        response = self.client.get(
+            f'/refbooks/{self.dictionary.id}/elements/?version=1.0')
+        self.assertEqual(response.data['elements'], [
+            {'code': '1', 'value': 'Ёж 1.0'}, {'code': '2', 'value': 'Два'}])
+
+        response = self.client.get(
+            f'/refbooks/{self.dictionary.id}/elements/')
+        self.assertEqual(len(response.data['elements']), 4)
+
+    def test_check_element_reads_archive(self):
+        url = f'/refbooks/{self.dictionary.id}/check-element/'
+        for params, exists in (
+            ({'code': '1', 'value': 'Ёж 1.0'}, True),
+            ({'code': '1', 'value': 'еж 1.0', 'match': 'normalized'}, True),
+            ({'code': '1', 'value': 'Ёж 2.0'}, False),
+        ):
+            response = self.client.get(url, {**params, 'version': '1.0'})
+            self.assertEqual(response.data, {"exists": exists}, params)
+
+    def test_filter_rebuild_includes_archive(self):
+        call_command('rebuild_element_filters', self.old.pk,
+                     stdout=io.StringIO())
+        self.old.refresh_from_db()
+        self.assertTrue(element_filters.might_contain(self.old, '1',
+                                                      'Ёж 1.0'))
+
+    def test_bundle_reads_archive(self):
+        date = self.old.start_date
+        response = self.client.get(
+            f'/refbooks/bundle/?codes=arch&date={date}')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['refbooks'][0]['version'], '1.0')
+        self.assertEqual(len(data['refbooks'][0]['elements']), 2)
+
+    def test_lookup_includes_archived_versions(self):
+        self.assertEqual(
+            ArchivedElementCode.objects.filter(version=self.old).count(), 2)
+        response = self.client.get('/refbooks/lookup/?code=1')
+        self.assertEqual(
+            [(match['version'], match['value'], match['archived'])
+             for match in response.data['matches']],
+            [('1.0', None, True), ('2.0', 'Ёж 2.0', False)])
+
+        response = self.client.get('/refbooks/lookup/?code=1&limit=1')
+        self.assertEqual(response.data['next'], self.old.pk)
+
+    @override_settings(ARCHIVE_CACHE_MAX_BYTES=100)
+    def test_archive_cache_bounded_by_bytes(self):
+        archive_cache = archive.ArchiveCache()
+        loads = []
+
+        def loader(key, size):
+            def load():
+                loads.append(key)
+                return key, size
+            return load
+
+        archive_cache.get('a', loader('a', 60))
+        archive_cache.get('b', loader('b', 60))
+        archive_cache.get('a', loader('a', 60))
+        self.assertEqual(loads, ['a', 'b', 'a'])
+
+        self.assertEqual(archive_cache.get('big', loader('big', 1000)), 'big')
+        archive_cache.get('big', loader('big', 1000))
+        self.assertEqual(loads[-2:], ['big', 'big'])
+
+    def test_archived_version_rejects_element_writes(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DictionaryElement.objects.create(
+                version=self.old, code='3', value='Три')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DictionaryElement.objects.bulk_create([
+                DictionaryElement(version=self.old, code='1', value='Дубль'),
+            ])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DictionaryElement.objects.filter(version=self.current).update(
+                version=self.old)
+
+        with self.assertRaises(ValidationError):
+            DictionaryElement(version=self.old, code='3',
+                              value='Три').full_clean()
+
+        response = self.client.get(
+            f'/refbooks/{self.dictionary.id}/elements/?version=1.0')
+        self.assertEqual(len(response.data['elements']), 2)
+
+    def test_archive_version_twice(self):
+        with self.assertRaises(ValueError):
+            archive.archive_version(self.old)
+
+    def test_archiving_records_no_change_events(self):
+        self.assertEqual(ChangeEvent.objects.count(), self.events_before)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Проверка роутера на двух файлах SQLite: основная база и реплика.
+    """
+    databases = {'default'}
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        engine = 'django.db.backends.sqlite3'
+        self.connections = ConnectionHandler({
+            'default': {
+                'ENGINE': engine,
+                'NAME': os.path.join(self.tmpdir.name, 'primary.sqlite3'),
+            },
+            'replica': {
+                'ENGINE': engine,
+                'NAME': os.path.join(self.tmpdir.name, 'replica.sqlite3'),
+            },
+            'replica2': {
+                'ENGINE': engine,
+                'NAME': os.path.join(self.tmpdir.name, 'replica2.sqlite3'),
+            },
+        })
+        for alias, value in (('default', 'primary'), ('replica', 'replica'),
+                             ('replica2', 'replica2')):
+            with self.connections[alias].cursor() as cursor:
+                cursor.execute('CREATE TABLE origin (name TEXT)')
+                cursor.execute('INSERT INTO origin VALUES (%s)', [value])
+
+        patcher = mock.patch.object(routers, 'connections', self.connections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        routers._replica_health.clear()
+        self.addCleanup(routers._replica_health.clear)
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        self.connections.close_all()
+        self.tmpdir.cleanup()
+
+    def read_origin(self):
+        alias = self.router.db_for_read(DictionaryElement)
+        with self.connections[alias].cursor() as cursor:
+            cursor.execute('SELECT name FROM origin')
+            return cursor.fetchone()[0]
+
+    def test_reads_outside_context_use_primary(self):
+        self.assertEqual(self.read_origin(), 'primary')
+
+    def test_reads_in_context_use_replica(self):
+        with routers.read_from_replica():
+            self.assertEqual(self.read_origin(), 'replica')
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica2'])
+    def test_context_keeps_one_replica(self):
+        for _ in range(5):
+            with routers.read_from_replica():
+                origin = self.read_origin()
+                self.assertIn(origin, ('replica', 'replica2'))
+                self.assertEqual(
+                    {self.read_origin() for _ in range(20)}, {origin})
+                with routers.read_from_replica():
+                    self.assertEqual(self.read_origin(), origin)
+                alias = routers.current_replica()
+            with routers.read_from_replica(alias):
+                self.assertEqual(self.read_origin(), origin)
+
+    def test_writes_use_primary(self):
+        with routers.read_from_replica():
+            self.assertEqual(
+                self.router.db_for_write(DictionaryElement), 'default')
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        self.connections['replica'].settings_dict['NAME'] = os.path.join(
+            self.tmpdir.name, 'missing', 'replica.sqlite3')
+        self.connections['replica'].close()
+        with routers.read_from_replica():
+            self.assertEqual(self.read_origin(), 'primary')
+
+    def test_broken_open_connection_marks_replica_unhealthy(self):
+        with routers.read_from_replica():
+            self.assertEqual(self.read_origin(), 'replica')
+        routers._replica_health.clear()
+
+        replica = self.connections['replica']
+        with mock.patch.object(
+            replica, 'cursor', side_effect=OperationalError('gone'),
+        ), mock.patch.object(replica, 'close') as close:
+            with routers.read_from_replica():
+                alias = self.router.db_for_read(DictionaryElement)
+        self.assertEqual(alias, 'default')
+        close.assert_called_once_with()
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(
+            self.router.allow_migrate('replica', 'dictionaries'))
+        self.assertIsNone(
+            self.router.allow_migrate('default', 'dictionaries'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingViewTests(TestCase):
+    """
+    Представления справочников читают из файла реплики, а запись и
+    админка работают с основной базой.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Псевдоним реплики добавляется только на время этих тестов, поэтому
+        # объявить его в `databases` заранее нельзя: проверки раннера
+        # выполняются до `setUpClass`.
+        cls.databases = {'default', 'replica'}
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = ConnectionHandler().configure_settings({
+            'default': {},
+            'replica': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.tmpdir.name, 'replica.sqlite3'),
+            },
+        })['replica']
+        with connections['replica'].schema_editor() as editor:
+            for model in (Dictionary, DictionaryVersion, DictionaryElement):
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        routers._replica_health.clear()
+        self.addCleanup(routers._replica_health.clear)
+        Dictionary.objects.using('replica').create(
+            code='from-replica', name='Replica refbook')
+        Dictionary.objects.create(code='from-primary', name='Primary refbook')
+
+    def test_refbook_views_read_from_replica(self):
+        response = self.client.get('/refbooks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        codes = [item['code'] for item in response.json()['refbooks']]
+        self.assertEqual(codes, ['from-replica'])
+
+    def test_writes_go_to_primary(self):
+        with routers.read_from_replica():
+            Dictionary.objects.create(code='written', name='Written')
+        self.assertTrue(
+            Dictionary.objects.using('default').filter(code='written').exists())
+        self.assertFalse(
+            Dictionary.objects.using('replica').filter(code='written').exists())
+
+    def test_admin_reads_primary(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(user)
+        response = self.client.get('/admin/dictionaries/dictionary/')
+        self.assertContains(response, 'Primary refbook')
+        self.assertNotContains(response, 'Replica refbook')
+
+
+class StaticSchemaTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.addCleanup(schema_views._schema_cache.clear)
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_DIR=self.tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_schema_missing(self):
+        response = self.client.get('/openapi.json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_schema_served_with_cache_headers(self):
+        call_command('build_openapi_schema', stdout=io.StringIO())
+
+        response = self.client.get('/openapi.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/refbooks/', response.json()['paths'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+        response = self.client.get(
+            '/openapi.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get('/openapi.yaml')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/yaml')
+
+    def test_ui_does_not_generate_schema(self):
+        with mock.patch(
+            'drf_yasg.generators.OpenAPISchemaGenerator.get_schema'
+        ) as get_schema:
+            for url in ('/swagger/', '/redoc/'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertContains(response, '/openapi.json')
+        get_schema.assert_not_called()
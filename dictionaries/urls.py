@@ -1,12 +1,18 @@
 from django.urls import path
 from .views import (
-    DictionaryListView, DictionaryElementsView, CheckElementView,
+    DictionaryListView, DictionaryElementsView, CheckElementView, BundleView,
+    ChangeFeedView, ChangeStreamView, ElementLookupView,
 )
 
 app_name = 'refbooks'
 
 urlpatterns = [
     path('', DictionaryListView.as_view(), name='list'),
+    path('bundle/', BundleView.as_view(), name='bundle'),
+    path('lookup/', ElementLookupView.as_view(), name='lookup'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+    path('changes/stream/', ChangeStreamView.as_view(),
+         name='changes-stream'),
     path('<int:id>/elements/', DictionaryElementsView.as_view(),
          name='elements'),
     path('<int:id>/check-element/', CheckElementView.as_view(),
@@ -22,4 +28,9 @@ URL конфигурация для справочников.
 - `elements`: Получение элементов конкретного справочника по его
 идентификатору.
 - `check-element`: Проверка наличия элемента в конкретной версии справочника.
+- `bundle`: Получение элементов текущих версий нескольких справочников
+одним запросом.
+- `lookup`: Поиск справочников и версий, содержащих элемент с заданным кодом.
+- `changes`: Лента изменений версий и элементов (long polling).
+- `changes-stream`: Та же лента в формате server-sent events.
 """
\ No newline at end of file
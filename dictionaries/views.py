@@ -1,16 +1,61 @@
+import hashlib
+import json
+import time
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Dictionary, DictionaryElement, DictionaryVersion
-from .serializers import DictionarySerializer, DictionaryElementSerializer
+from .archive import archived_contains, archived_elements
+from .changefeed import wait_for_events
+from .compression import COMPRESSORS, preferred_encoding
+from .element_filters import might_contain
+from .models import (
+    ArchivedElementCode, Dictionary, DictionaryElement, DictionaryVersion,
+)
+from .renderers import CBORRenderer, ColumnarJSONRenderer, MessagePackRenderer
+from .routers import current_replica, read_from_replica
+from .serializers import (
+    ChangeEventSerializer, DictionarySerializer, DictionaryElementSerializer,
+    ElementLookupSerializer,
+)
 from .swagger_schemas import (
     dictionary_list_schema, dictionary_elements_schema, check_element_schema,
+    bundle_schema, change_feed_schema, change_stream_schema,
+    element_lookup_schema,
 )
 
+# Количество элементов, читаемых из базы за один запрос при потоковой отдаче.
+BUNDLE_CHUNK_SIZE = 2000
+
+
+class ReplicaReadMixin:
+    """
+    Примесь для представлений, которые только читают данные.
+
+    Безопасные запросы (GET, HEAD, OPTIONS) выполняются внутри
+    `read_from_replica()`, поэтому роутер направляет их на реплики
+    из `settings.DATABASE_REPLICAS`.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
 
-class DictionaryListView(APIView):
+class DictionaryListView(ReplicaReadMixin, APIView):
     """
     Получение списка справочников.
 
@@ -72,7 +117,7 @@ class DictionaryListView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class DictionaryElementsView(APIView):
+class DictionaryElementsView(ReplicaReadMixin, APIView):
     """
     Получение элементов справочника.
 
@@ -93,6 +138,22 @@ class DictionaryElementsView(APIView):
         - `code`: Код элемента.
         - `value`: Значение элемента.
 
+    Формат выбирается заголовком `Accept` (или параметром `format`):
+    - `application/json` (по умолчанию).
+    - `application/vnd.refbooks.columnar+json`: колоночный JSON
+      `{"codes": [...], "values": [...]}`.
+    - `application/msgpack`: MessagePack.
+    - `application/cbor`: CBOR.
+
+    Элементы архивных версий (см. `ArchivedElements`) читаются из архива
+    и отдаются вместе с остальными.
+
+    Если клиент передал `Accept-Encoding: br` или `gzip`, ответ отдаётся
+    сжатым и кэшируется для каждого формата и кодировки. Ключ кэша включает
+    ревизии элементов версий (`elements_revision`), которые увеличиваются в
+    той же транзакции, что и любая запись элементов, поэтому после
+    изменения элементов тело ответа строится заново.
+
     Примеры:
     - Запрос для получения элементов справочника с ID 1:
       `GET /refbooks/1/elements/`
@@ -102,6 +163,10 @@ class DictionaryElementsView(APIView):
       `GET /refbooks/1/elements/?version=1.0`
       Ответ: Элементы версии 1.0 справочника с ID 1.
     """
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES,
+        ColumnarJSONRenderer, MessagePackRenderer, CBORRenderer,
+    ]
 
     @dictionary_elements_schema
     def get(self, request, *args, **kwargs):
@@ -117,14 +182,80 @@ class DictionaryElementsView(APIView):
                 version__dictionary_id=dictionary_id
             )
 
-        serializer = DictionaryElementSerializer(elements, many=True)
+        encoding = preferred_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding and not isinstance(
+            request.accepted_renderer, BrowsableAPIRenderer
+        ):
+            return self.compressed_response(elements, version, encoding)
+
+        serializer = DictionaryElementSerializer(
+            self.with_archived(elements, version), many=True
+        )
 
         response_data = {"elements": serializer.data}
 
         return Response(response_data)
 
+    def with_archived(self, elements, version):
+        archived_versions = DictionaryVersion.objects.filter(
+            dictionary_id=self.kwargs['id'], archived=True
+        ).defer('element_filter').order_by('pk')
+        if version:
+            archived_versions = archived_versions.filter(version=version)
+
+        archived = [
+            {"code": code, "value": value}
+            for archived_version in archived_versions
+            for code, value in archived_elements(archived_version)
+        ]
+        if not archived:
+            return elements
+        return [*archived, *elements]
+
+    def compressed_response(self, elements, version, encoding):
+        request = self.request
+        renderer = request.accepted_renderer
+
+        versions = DictionaryVersion.objects.filter(
+            dictionary_id=self.kwargs['id']
+        )
+        if version:
+            versions = versions.filter(version=version)
+        revisions = ','.join(
+            f'{pk}.{revision}' for pk, revision in versions.order_by(
+                'pk'
+            ).values_list('pk', 'elements_revision')
+        )
+        cache_key = 'refbooks:elements:%s' % hashlib.sha256(
+            f'{self.kwargs["id"]}|{version}|{revisions}|'
+            f'{request.accepted_media_type}|{encoding}'.encode()
+        ).hexdigest()
+
+        body = cache.get(cache_key)
+        if body is None:
+            serializer = DictionaryElementSerializer(
+                self.with_archived(elements, version), many=True
+            )
+            content = renderer.render(
+                {"elements": serializer.data},
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            body = COMPRESSORS[encoding](content)
+            cache.set(cache_key, body, settings.ELEMENTS_CACHE_TIMEOUT)
 
-class CheckElementView(APIView):
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = HttpResponse(body, content_type=content_type)
+        response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+
+class CheckElementView(ReplicaReadMixin, APIView):
     """
     Проверка существования элемента справочника.
 
@@ -138,6 +269,11 @@ class CheckElementView(APIView):
     - `version` (опционально): Версия справочника. Если указана, проверяет
       элемент в этой версии. Если параметр не указан, проверяется элемент
       в текущей версии справочника.
+    - `match` (опционально): Режим сравнения. `exact` (по умолчанию) —
+      точное совпадение кода и значения. `normalized` — сравнение без учёта
+      регистра, лишних пробелов, формы Unicode (NFC/NFD) и различия «ё»/«е».
+      Нормализованные код и значение хранятся в индексированных полях
+      элемента, поэтому проверка в этом режиме так же быстра, как точная.
 
     Параметры URL:
     - `id`: Идентификатор справочника.
@@ -156,8 +292,15 @@ class CheckElementView(APIView):
       `GET /refbooks/1/check-element/?code=001&value=Пример&version=1.0`
       Ответ: `{"exists": true}` или `{"exists": false}`.
 
+    - Запрос для нестрогой проверки элемента:
+      `GET /refbooks/1/check-element/?code=001&value=пример&match=normalized`
+      Ответ: `{"exists": true}` или `{"exists": false}`.
+
+    Для архивных версий элемент ищется в распакованном архиве.
+
     В случае, если версия не найдена, возвращается код состояния 404 с
-    соответствующим сообщением.
+    соответствующим сообщением. При неизвестном режиме `match`
+    возвращается код состояния 400.
     """
 
     @check_element_schema
@@ -165,19 +308,29 @@ class CheckElementView(APIView):
         code = request.query_params.get('code')
         value = request.query_params.get('value')
         version_param = request.query_params.get('version')
+        match = request.query_params.get('match', 'exact')
+
+        if match not in ('exact', 'normalized'):
+            return Response(
+                {"error": "Неизвестный режим сравнения. "
+                          "Используйте exact или normalized."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         if version_param:
             try:
-                version = DictionaryVersion.objects.get(
-                    dictionary_id=id, version=version_param
-                )
+                version = DictionaryVersion.objects.defer(
+                    'element_filter'
+                ).get(dictionary_id=id, version=version_param)
             except DictionaryVersion.DoesNotExist:
                 return Response(
                     {"exists": False}, status=status.HTTP_404_NOT_FOUND
                 )
         else:
             current_date = timezone.now().date()
-            version = DictionaryVersion.objects.filter(
+            version = DictionaryVersion.objects.defer(
+                'element_filter'
+            ).filter(
                 dictionary_id=id, start_date__lte=current_date
             ).order_by('-start_date').first()
 
@@ -186,11 +339,446 @@ class CheckElementView(APIView):
                     {"exists": False}, status=status.HTTP_404_NOT_FOUND
                 )
 
-        exists = DictionaryElement.objects.filter(
-            version=version, code=code, value=value
-        ).exists()
+        normalized = match == 'normalized'
+        if code is None or value is None:
+            exists = False
+        elif not normalized and not might_contain(version, code, value):
+            # Фильтр Блума версии отсекает отсутствующие элементы без
+            # запроса к таблице элементов.
+            exists = False
+        elif version.archived and archived_contains(
+            version, code, value, normalized
+        ):
+            exists = True
+        elif normalized:
+            exists = DictionaryElement.objects.filter(
+                version=version
+            ).normalized_match_exists(code, value)
+        else:
+            exists = DictionaryElement.objects.filter(
+                version=version, code=code, value=value
+            ).exists()
 
         return Response(
             {"exists": exists},
             status=status.HTTP_200_OK
         )
+
+
+class BundleView(ReplicaReadMixin, APIView):
+    """
+    Получение нескольких справочников одним запросом.
+
+    Этот метод обрабатывает GET-запросы для получения элементов текущих
+    версий сразу нескольких справочников. Для каждого кода справочника
+    выбирается версия с наибольшей датой начала (`start_date`), не
+    превышающей указанную дату. Ответ отдаётся потоком и сжимается gzip,
+    если клиент принимает эту кодировку (`Accept-Encoding`).
+
+    Параметры запроса:
+    - `codes`: Коды справочников через запятую. Повторы игнорируются.
+    - `date` (опционально): Дата в формате ГГГГ-ММ-ДД. Если не указана,
+      используется текущая дата.
+    - `known` (опционально): Отпечатки (`fingerprint`) разделов, которые
+      уже есть у клиента, через запятую. Элементы таких разделов не
+      передаются.
+
+    Формат ответа:
+    - `date`: Дата, на которую выбраны версии.
+    - `missing`: Коды справочников, для которых не найдено действующей
+      версии.
+    - `refbooks`: Список разделов. Каждый раздел содержит поля:
+        - `id`, `code`: Идентификатор и код справочника.
+        - `version`, `start_date`: Версия справочника и дата её начала.
+        - `fingerprint`: SHA-256 от версии и ревизии её элементов.
+          Значение меняется при любом изменении элементов, поэтому клиент
+          может использовать его как ключ локального кэша. Отпечаток
+          передаётся перед элементами.
+        - `elements`: Элементы версии (`code`, `value`), упорядоченные
+          по коду.
+        - `unchanged`: `true` вместо `elements`, если отпечаток раздела
+          передан в `known`.
+
+    Примеры:
+    - `GET /refbooks/bundle/?codes=001,002`
+    - `GET /refbooks/bundle/?codes=001,002&date=2024-08-30`
+    - `GET /refbooks/bundle/?codes=001,002&known=9f86d0...`
+
+    Если не указан параметр `codes` или дата имеет неверный формат,
+    возвращается код состояния 400 с сообщением об ошибке.
+    """
+
+    @bundle_schema
+    def get(self, request, *args, **kwargs):
+        codes = list(dict.fromkeys(
+            code.strip()
+            for code in request.query_params.get('codes', '').split(',')
+            if code.strip()
+        ))
+        if not codes:
+            return Response(
+                {"error": "Укажите коды справочников в параметре codes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        date = request.query_params.get('date')
+        if date:
+            try:
+                query_date = timezone.datetime.strptime(
+                    date, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {"error": "Неверный формат даты. Используйте ГГГГ-ММ-ДД."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            query_date = timezone.now().date()
+
+        current = {}
+        versions = DictionaryVersion.objects.filter(
+            dictionary__code__in=codes, start_date__lte=query_date
+        ).select_related('dictionary').defer('element_filter').order_by(
+            'dictionary_id', '-start_date'
+        )
+        for version in versions:
+            current.setdefault(version.dictionary.code, version)
+
+        sections = [current[code] for code in codes if code in current]
+        missing = [code for code in codes if code not in current]
+
+        known = {
+            fingerprint.strip()
+            for fingerprint in request.query_params.get('known', '').split(',')
+        }
+
+        content = self.stream_bundle(
+            query_date, sections, missing, known, current_replica()
+        )
+        # Потоковое сжатие поддерживается только для gzip.
+        encoding = preferred_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), ('gzip',)
+        )
+        if encoding:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(
+            content, content_type='application/json'
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def stream_bundle(self, query_date, sections, missing, known, alias):
+        # Генератор выполняется после выхода из dispatch(), поэтому
+        # контекст чтения нужно открыть заново — на той же реплике, с
+        # которой прочитаны версии и их отпечатки.
+        with read_from_replica(alias):
+            yield ('{"date": %s, "missing": %s, "refbooks": [' % (
+                json.dumps(query_date.isoformat()),
+                json.dumps(missing, ensure_ascii=False),
+            )).encode()
+            for index, version in enumerate(sections):
+                if index:
+                    yield b', '
+                yield from self.stream_section(version, known)
+            yield b']}'
+
+    @staticmethod
+    def section_fingerprint(version):
+        """
+        Отпечаток раздела: SHA-256 от идентичности версии и ревизии её
+        элементов. Вычисляется без чтения элементов.
+        """
+        return hashlib.sha256(
+            f'{version.pk}:{version.version}:{version.start_date}:'
+            f'{version.elements_revision}'.encode()
+        ).hexdigest()
+
+    def stream_section(self, version, known):
+        fingerprint = self.section_fingerprint(version)
+        yield (
+            '{"id": %d, "code": %s, "version": %s, "start_date": %s, '
+            '"fingerprint": %s, ' % (
+                version.dictionary.pk,
+                json.dumps(version.dictionary.code, ensure_ascii=False),
+                json.dumps(version.version, ensure_ascii=False),
+                json.dumps(version.start_date.isoformat()),
+                json.dumps(fingerprint),
+            )
+        ).encode()
+        if fingerprint in known:
+            yield b'"unchanged": true}'
+            return
+
+        yield b'"elements": ['
+        elements = DictionaryElement.objects.filter(
+            version=version
+        ).order_by('code').values_list('code', 'value')
+        if version.archived:
+            pairs = sorted([*archived_elements(version), *elements])
+        else:
+            pairs = elements.iterator(chunk_size=BUNDLE_CHUNK_SIZE)
+
+        chunk, separator = [], b''
+        for code, value in pairs:
+            chunk.append(json.dumps(
+                {"code": code, "value": value}, ensure_ascii=False
+            ).encode())
+            if len(chunk) == BUNDLE_CHUNK_SIZE:
+                yield separator + b', '.join(chunk)
+                chunk, separator = [], b', '
+        if chunk:
+            yield separator + b', '.join(chunk)
+        yield b']}'
+
+
+def parse_offset(value):
+    """
+    Разбирает смещение в ленте изменений. Возвращает `None`, если значение
+    не является неотрицательным целым числом.
+    """
+    if not value:
+        return 0
+    try:
+        offset = int(value)
+    except ValueError:
+        return None
+    return offset if offset >= 0 else None
+
+
+class ChangeFeedView(APIView):
+    """
+    Получение ленты изменений справочников (long polling).
+
+    Этот метод обрабатывает GET-запросы для получения событий журнала
+    изменений после указанного смещения. Если новых событий нет и указан
+    параметр `wait`, ответ задерживается до появления событий или
+    истечения времени ожидания.
+
+    Событие попадает в ленту через `CHANGE_FEED_SETTLE_DELAY` секунд после
+    записи, чтобы события поздно зафиксированных транзакций не оказались
+    позади смещения подписчика. Лента читается из основной базы, а не с
+    реплик: отставание реплики могло бы превысить эту задержку.
+
+    Ожидающий запрос занимает поток сервера приложений, но не соединение с
+    базой: перед ожиданием соединения закрываются, а о новых событиях
+    сообщает общий для процесса наблюдатель (`ChangeNotifier`). Число
+    одновременно ожидающих подписчиков ограничено числом потоков сервера,
+    поэтому ленту изменений стоит обслуживать отдельным пулом потоковых
+    воркеров (например, gunicorn с `--threads`).
+
+    Параметры запроса:
+    - `after` (опционально): Идентификатор последнего полученного события.
+      По умолчанию 0, то есть лента читается с начала.
+    - `wait` (опционально): Время ожидания новых событий в секундах, не
+      больше `CHANGE_FEED_MAX_WAIT`. По умолчанию 0.
+
+    Формат ответа:
+    - `events`: Список событий (не больше `CHANGE_FEED_PAGE_SIZE`).
+    - `next`: Смещение для следующего запроса.
+
+    Примеры:
+    - `GET /refbooks/changes/?after=42&wait=30`
+      Ответ: События с идентификатором больше 42.
+
+    Если `after` или `wait` не являются неотрицательными целыми числами,
+    возвращается код состояния 400 с сообщением об ошибке.
+    """
+
+    @change_feed_schema
+    def get(self, request, *args, **kwargs):
+        after = parse_offset(request.query_params.get('after'))
+        wait = parse_offset(request.query_params.get('wait'))
+        if after is None or wait is None:
+            return Response(
+                {"error": "Параметры after и wait должны быть "
+                          "неотрицательными целыми числами."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        events = wait_for_events(
+            after, settings.CHANGE_FEED_PAGE_SIZE,
+            min(wait, settings.CHANGE_FEED_MAX_WAIT),
+        )
+
+        serializer = ChangeEventSerializer(events, many=True)
+        response_data = {
+            "events": serializer.data,
+            "next": events[-1].pk if events else after,
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class ChangeStreamView(APIView):
+    """
+    Поток изменений справочников (server-sent events).
+
+    Этот метод обрабатывает GET-запросы и отдаёт события журнала изменений
+    в формате `text/event-stream`. Идентификатор события передаётся в поле
+    `id`, поэтому после обрыва соединения браузер или клиент продолжает
+    чтение с заголовком `Last-Event-ID`. Сервер закрывает поток через
+    `CHANGE_FEED_STREAM_TIMEOUT` секунд, клиент переподключается
+    автоматически.
+
+    Каждый открытый поток занимает поток сервера приложений на всё время
+    соединения, но не соединение с базой (см. `ChangeFeedView`).
+
+    Параметры запроса:
+    - `after` (опционально): Смещение, с которого начинается поток, если
+      не передан заголовок `Last-Event-ID`.
+
+    Формат события:
+    ```
+    id: 42
+    event: elements_changed
+    data: {"id": 42, "kind": "elements_changed", ...}
+    ```
+
+    Если смещение не является неотрицательным целым числом, возвращается
+    код состояния 400 с сообщением об ошибке.
+    """
+
+    @change_stream_schema
+    def get(self, request, *args, **kwargs):
+        after = parse_offset(
+            request.META.get('HTTP_LAST_EVENT_ID')
+            or request.query_params.get('after')
+        )
+        if after is None:
+            return Response(
+                {"error": "Смещение должно быть неотрицательным целым "
+                          "числом."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            self.stream_events(after), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream_events(self, after):
+        deadline = time.monotonic() + settings.CHANGE_FEED_STREAM_TIMEOUT
+        heartbeat_at = time.monotonic() + settings.CHANGE_FEED_HEARTBEAT
+        yield b'retry: 1000\n\n'
+
+        while True:
+            timeout = max(0, min(deadline, heartbeat_at) - time.monotonic())
+            events = wait_for_events(
+                after, settings.CHANGE_FEED_PAGE_SIZE, timeout
+            )
+            for event in events:
+                data = json.dumps(
+                    ChangeEventSerializer(event).data, ensure_ascii=False
+                )
+                yield (
+                    f'id: {event.pk}\nevent: {event.kind}\n'
+                    f'data: {data}\n\n'
+                ).encode()
+                after = event.pk
+
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if events:
+                heartbeat_at = now + settings.CHANGE_FEED_HEARTBEAT
+            elif now >= heartbeat_at:
+                yield b': keep-alive\n\n'
+                heartbeat_at = now + settings.CHANGE_FEED_HEARTBEAT
+
+
+class ElementLookupView(ReplicaReadMixin, APIView):
+    """
+    Поиск справочников и версий, содержащих элемент с заданным кодом.
+
+    Этот метод обрабатывает GET-запросы для обратного поиска: по коду
+    элемента возвращаются все справочники и версии, в которых он есть.
+    Запрос использует индексы `(code, version)` таблицы элементов и
+    таблицы кодов архивных версий (`ArchivedElementCode`) и не перебирает
+    справочники.
+
+    Параметры запроса:
+    - `code`: Код элемента справочника.
+    - `after` (опционально): Идентификатор версии, после которой
+      продолжается выдача (значение `next` предыдущей страницы).
+    - `limit` (опционально): Размер страницы, не больше
+      `ELEMENT_LOOKUP_MAX_PAGE_SIZE`. По умолчанию
+      `ELEMENT_LOOKUP_PAGE_SIZE`.
+
+    Формат ответа:
+    - `matches`: Список совпадений, упорядоченный по идентификатору версии,
+      то есть в порядке индекса `(code, version)`. Каждое совпадение
+      содержит поля:
+        - `refbook_id`, `refbook_code`, `refbook_name`: Идентификатор, код
+          и название справочника.
+        - `version_id`, `version`, `start_date`: Идентификатор версии,
+          версия справочника и дата её начала.
+        - `value`: Значение элемента в этой версии или `null` для
+          архивной версии.
+        - `archived`: `true`, если версия архивная. Значение элемента
+          можно получить из `/refbooks/<id>/elements/?version=...`.
+    - `next`: Значение `after` для следующей страницы или `null`, если
+      страница последняя.
+
+    Примеры:
+    - `GET /refbooks/lookup/?code=001`
+    - `GET /refbooks/lookup/?code=001&after=42&limit=500`
+
+    Если параметр `code` не указан или `after` и `limit` не являются
+    неотрицательными целыми числами, возвращается код состояния 400 с
+    сообщением об ошибке.
+    """
+
+    @element_lookup_schema
+    def get(self, request, *args, **kwargs):
+        code = request.query_params.get('code')
+        if not code:
+            return Response(
+                {"error": "Укажите код элемента в параметре code."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        after = parse_offset(request.query_params.get('after'))
+        limit = parse_offset(request.query_params.get('limit'))
+        if after is None or limit is None:
+            return Response(
+                {"error": "Параметры after и limit должны быть "
+                          "неотрицательными целыми числами."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(
+            limit or settings.ELEMENT_LOOKUP_PAGE_SIZE,
+            settings.ELEMENT_LOOKUP_MAX_PAGE_SIZE,
+        )
+
+        fields = (
+            'version_id', 'version__dictionary_id',
+            'version__dictionary__code', 'version__dictionary__name',
+            'version__version', 'version__start_date',
+        )
+        hot = DictionaryElement.objects.filter(
+            code=code, version_id__gt=after
+        ).values(*fields, 'value').order_by('version_id')[:limit + 1]
+        archived = ArchivedElementCode.objects.filter(
+            code=code, version_id__gt=after
+        ).values(*fields).order_by('version_id')[:limit + 1]
+        matches = sorted(
+            [
+                *({**match, 'archived': False} for match in hot),
+                *({**match, 'value': None, 'archived': True}
+                  for match in archived),
+            ],
+            key=itemgetter('version_id'),
+        )
+
+        next_after = None
+        if len(matches) > limit:
+            matches = matches[:limit]
+            next_after = matches[-1]['version_id']
+
+        serializer = ElementLookupSerializer(matches, many=True)
+
+        response_data = {"matches": serializer.data, "next": next_after}
+        return Response(response_data, status=status.HTTP_200_OK)
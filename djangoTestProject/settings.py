@@ -81,9 +81,35 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections: reuse a connection for up to 10 minutes
+        # instead of reopening it on every request.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas. Add an alias to DATABASES and list it here, e.g.:
+#
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.postgresql',
+#         'NAME': 'dictionaries',
+#         'HOST': 'replica.internal',
+#         # CONN_MAX_AGE must be 0 when the psycopg pool is enabled.
+#         'CONN_MAX_AGE': 0,
+#         'OPTIONS': {'pool': {'min_size': 2, 'max_size': 20}},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+#
+# Read-only refbook views are routed to a healthy replica; writes, admin
+# and migrations always use 'default'.
+
+DATABASE_ROUTERS = ['dictionaries.routers.ReplicaRouter']
+
+DATABASE_REPLICAS = []
+
+# Seconds a replica health check result is reused before re-checking.
+DATABASE_REPLICA_HEALTH_CHECK_INTERVAL = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -125,3 +151,79 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# OpenAPI schema
+# The schema is generated at build time with `manage.py build_openapi_schema`
+# and served as a static file. Set OPENAPI_LIVE_SCHEMA = True in development
+# to regenerate it on every request instead.
+
+OPENAPI_LIVE_SCHEMA = False
+
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+
+OPENAPI_SCHEMA_CACHE_MAX_AGE = 60 * 60
+
+SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'djangoTestProject.urls.api_info',
+    'SPEC_URL': ('openapi-schema', {'format': '.json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('openapi-schema', {'format': '.json'}),
+}
+
+
+# Refbook change feed
+#
+# A waiting long-poll request or an open event stream holds one server
+# thread for its whole duration. Database connections are closed while a
+# subscriber waits, and a single background thread per process polls for
+# new events, so subscribers do not add database load. The number of
+# concurrent subscribers is bounded by the number of server threads:
+# serve the feed from a separate pool of threaded workers, e.g.
+#
+#     gunicorn djangoTestProject.wsgi --worker-class gthread --threads 100
+
+# Maximum number of events returned by one request.
+CHANGE_FEED_PAGE_SIZE = 500
+
+# Upper bound for the `wait` parameter of /refbooks/changes/, in seconds.
+CHANGE_FEED_MAX_WAIT = 30
+
+# How often the per-process notifier checks for new events, in seconds.
+CHANGE_FEED_POLL_INTERVAL = 1
+
+# Events are written in the same transaction as the change and delivered
+# only once they are this many seconds old, so an event whose transaction
+# commits after a newer one is not skipped. The delay must exceed the time
+# between the first element write of a transaction and its commit; raise it
+# for long-running imports. The feed is always read from the primary
+# database because replica lag is not bounded by this delay.
+CHANGE_FEED_SETTLE_DELAY = 1
+
+# Server-sent event streams are closed after this many seconds; clients
+# reconnect with Last-Event-ID.
+CHANGE_FEED_STREAM_TIMEOUT = 300
+
+# Idle interval after which a keep-alive comment is sent, in seconds.
+CHANGE_FEED_HEARTBEAT = 15
+
+
+# Default and maximum page size of /refbooks/lookup/.
+ELEMENT_LOOKUP_PAGE_SIZE = 100
+ELEMENT_LOOKUP_MAX_PAGE_SIZE = 1000
+
+
+# Compressed /refbooks/<id>/elements/ bodies are cached per format and
+# encoding. Keys include element revisions, so entries never go stale and a
+# long timeout is safe.
+ELEMENTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# `manage.py archive_versions` moves elements of versions superseded more
+# than this many days ago into compressed per-version archives.
+ARCHIVE_AFTER_DAYS = 365
+
+# Upper bound, in bytes, for decompressed archives kept in memory by each
+# process. Archives larger than this are decompressed on every request.
+ARCHIVE_CACHE_MAX_BYTES = 64 * 1024 * 1024
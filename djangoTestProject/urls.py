@@ -14,22 +14,29 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from dictionaries.schema_views import (
+    RedocUIView, SchemaUIView, StaticSchemaView,
+)
+
+
+api_info = openapi.Info(
+    title="API Dictionaries",
+    default_version='v1',
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@yourapi.local"),
+    license=openapi.License(name="BSD License"),
+)
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="API Dictionaries",
-        default_version='v1',
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@yourapi.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    api_info,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
@@ -37,8 +44,24 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('refbooks/', include('dictionaries.urls', namespace='refbooks')),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0),
-         name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0),
-         name='schema-redoc'),
 ]
+
+if settings.OPENAPI_LIVE_SCHEMA:
+    # Development only: the schema is regenerated on every request.
+    urlpatterns += [
+        re_path(r'^openapi(?P<format>\.json|\.yaml)$',
+                schema_view.without_ui(cache_timeout=0),
+                name='openapi-schema'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0),
+             name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0),
+             name='schema-redoc'),
+    ]
+else:
+    # The schema is built by `manage.py build_openapi_schema`.
+    urlpatterns += [
+        re_path(r'^openapi(?P<format>\.json|\.yaml)$',
+                StaticSchemaView.as_view(), name='openapi-schema'),
+        path('swagger/', SchemaUIView.as_view(), name='schema-swagger-ui'),
+        path('redoc/', RedocUIView.as_view(), name='schema-redoc'),
+    ]